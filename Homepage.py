@@ -8,5 +8,5 @@ st.set_page_config(
 
 st.title("Financial Dashboards")
 image_path = "medkicklogo.png"
-st.image(image_path, caption="", use_column_width=True)
+st.image(image_path, caption="", width="stretch")
 st.sidebar.success("Select a page above.")
@@ -0,0 +1,181 @@
+"""
+Generate the dashboard reports as CSV files without running the Streamlit app.
+
+Every report is computed for each period of a date range (one file per report and
+period) and the jobs run in parallel worker processes, e.g.
+
+    python batch_reports.py cost pl calls --start 2023-01 --end 2023-12 --by quarter --per-nurse
+
+writes report_output/cost/cost_2023-01_2023-03.csv, ... Reports:
+
+    cost     Statistics per KPI of the cost workbook, plus the combined row ('All KPIs')
+    revenue  Statistics of the revenue KPIs of the finance workbook
+    pl       Statistics per line of the profit and loss workbook
+    streams  Revenue per service and month of the revenue streams CSV
+    calls    Call volume and duration metrics (one row per nurse with --per-nurse)
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import streamlit.logger
+
+# The loaders' Streamlit caches work without a server but warn about it on every use
+streamlit.logger.set_log_level('error')
+
+from call_logs import CallLogStore  # noqa: E402
+from data_loader import load_revenue_cube, load_sheet_matrix, load_year_matrix  # noqa: E402
+from kpi_store import MONTH_YEAR, ordinal_year_month, period_ordinal  # noqa: E402
+from reports import REVENUE_KPIS, call_report, combined_expenditure, kpi_report, month_labels, revenue_by_service  # noqa: E402
+
+# Data each report reads, as used by the dashboard pages (override with --source report=path)
+SOURCES = {
+    'cost': 'KPI123.xlsx',
+    'revenue': 'finance.xlsx',
+    'pl': 'Med-Kick_Investment.xlsx',
+    'streams': 'FinDataOutputRevenue.csv',
+    'calls': 'Sasi',
+}
+
+MONTHS_PER_PERIOD = {'month': 1, 'quarter': 3, 'year': 12}
+
+logger = logging.getLogger('batch_reports')
+
+# Call log stores opened by this process, by folder
+_stores = {}
+
+
+def parse_month(text):
+    """Period ordinal of a 'YYYY-MM' argument."""
+    try:
+        year, month = text.split('-')
+        if not 1 <= int(month) <= 12:
+            raise ValueError
+        return period_ordinal(year, month)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected YYYY-MM, got {text!r}')
+
+
+def month_text(ordinal):
+    year, month = ordinal_year_month(ordinal)
+    return f'{year}-{month:02d}'
+
+
+def report_periods(start_period, end_period, by='month'):
+    """(first, last) period ordinals covering start_period..end_period, split at calendar months, quarters or years."""
+    if by == 'all':
+        return [(start_period, end_period)]
+    size = MONTHS_PER_PERIOD[by]
+    periods = []
+    first = start_period
+    while first <= end_period:
+        last = min(first - first % size + size - 1, end_period)
+        periods.append((first, last))
+        first = last + 1
+    return periods
+
+
+def call_log_store(folder_path):
+    if folder_path not in _stores:
+        _stores[folder_path] = CallLogStore(folder_path)
+    store = _stores[folder_path]
+    store.refresh()
+    return store
+
+
+def build_report(report, source, first, last, per_nurse=False):
+    """
+    The report frame for the months first..last (period ordinals, inclusive).
+
+    source is the report's file, or for 'calls' the call log folder or its
+    daily_rollup() (what workers get, so only the parent process refreshes the store).
+    """
+    if report in ('cost', 'revenue'):
+        selected_kpis = REVENUE_KPIS if report == 'revenue' else None
+        kpis = load_year_matrix(source)
+        table, stats = kpi_report(kpis, month_labels(*ordinal_year_month(first), *ordinal_year_month(last)), selected_kpis)
+        if report == 'cost':
+            stats = pd.concat([stats, pd.DataFrame([{'KPI': 'All KPIs', **combined_expenditure(table)}])], ignore_index=True)
+        return stats
+    if report == 'pl':
+        kpis = load_sheet_matrix(source, 'Sheet1', usecols='A:S')
+        labels = month_labels(*ordinal_year_month(first), *ordinal_year_month(last), MONTH_YEAR)
+        return kpi_report(kpis, labels, lowest_excludes='zero')[1]
+    if report == 'streams':
+        return revenue_by_service(load_revenue_cube(source), first, last).reset_index()
+    if report == 'calls':
+        rollup = source if isinstance(source, pd.DataFrame) else call_log_store(source).daily_rollup
+        start = pd.Timestamp(*ordinal_year_month(first), 1)
+        end = pd.Timestamp(*ordinal_year_month(last + 1), 1)  # Calls must end by the start of the next month
+        return call_report(rollup, start, end, per_nurse=per_nurse)
+    raise ValueError(f'Unknown report {report!r}')
+
+
+def run_job(report, source, first, last, output_dir, per_nurse=False):
+    """Build one report and write it to output_dir/report/; returns (path, rows, seconds)."""
+    started = time.perf_counter()
+    frame = build_report(report, source, first, last, per_nurse)
+    folder = os.path.join(output_dir, report)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f'{report}_{month_text(first)}_{month_text(last)}.csv')
+    frame.to_csv(path, index=False)
+    return path, len(frame), time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('reports', nargs='*', metavar='report',
+                        help=f"reports to build ({', '.join(SOURCES)}; default: all)")
+    parser.add_argument('--start', type=parse_month, required=True, help='first month, YYYY-MM')
+    parser.add_argument('--end', type=parse_month, required=True, help='last month, YYYY-MM')
+    parser.add_argument('--by', choices=['month', 'quarter', 'year', 'all'], default='month',
+                        help='one report per month, quarter, year or for the whole range (default: month)')
+    parser.add_argument('--per-nurse', action='store_true', help='calls report: one row per nurse')
+    parser.add_argument('--source', action='append', default=[], metavar='REPORT=PATH',
+                        help='read a report from another workbook, CSV or call log folder')
+    parser.add_argument('--output', default='report_output', help='output folder (default: report_output)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    sources = dict(SOURCES)
+    for override in args.source:
+        report, _, path = override.partition('=')
+        if report not in SOURCES or not path:
+            parser.error(f'--source expects REPORT=PATH with REPORT one of {", ".join(SOURCES)}')
+        sources[report] = path
+    reports = list(dict.fromkeys(args.reports or SOURCES))
+    unknown = [report for report in reports if report not in SOURCES]
+    if unknown:
+        parser.error(f'unknown report(s) {", ".join(unknown)}; choose from {", ".join(SOURCES)}')
+
+    # Build the sidecars once, so workers only read them, and refresh the call log store
+    # here only: workers get its rollup rather than appending to the store themselves
+    job_sources = {}
+    for report in reports:
+        if report == 'calls':
+            job_sources[report] = call_log_store(sources[report]).daily_rollup
+        else:
+            build_report(report, sources[report], args.start, args.start)
+            job_sources[report] = sources[report]
+
+    jobs = [(report, job_sources[report], first, last, args.output, args.per_nurse)
+            for report in reports for first, last in report_periods(args.start, args.end, args.by)]
+    started = time.perf_counter()
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs))) as executor:
+            futures = [executor.submit(run_job, *job) for job in jobs]
+            results = [future.result() for future in as_completed(futures)]
+    else:
+        results = [run_job(*job) for job in jobs]
+    for path, rows, seconds in sorted(results):
+        logger.info('%s: %d rows in %.2fs', path, rows, seconds)
+    logger.info('%d reports in %.2fs', len(results), time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    main()
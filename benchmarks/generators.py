@@ -0,0 +1,137 @@
+"""
+Synthetic inputs in the layouts the dashboard pages read.
+
+generate_dataset() writes a folder that can stand in for the repository root:
+KPI123.xlsx and finance.xlsx (one sheet per year, 'KPI' plus a column per month
+name), Med-Kick_Investment.xlsx ('KPI' plus 'Month_YYYY' columns),
+FinDataOutputRevenue.csv (one row per service and year) and a Sasi folder of
+call-log exports.
+"""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from kpi_store import MONTH_NAMES
+from reports import REVENUE_KPIS
+
+# Scales for benchmarks/run.py --scale; any value can be overridden on the command line
+SCALES = {
+    'small': dict(kpis=10, years=3, pl_months=18, services=10, call_files=4, call_rows=25_000),
+    'medium': dict(kpis=40, years=5, pl_months=18, services=50, call_files=10, call_rows=100_000),
+    'large': dict(kpis=100, years=10, pl_months=18, services=200, call_files=20, call_rows=100_000),
+}
+
+FIRST_YEAR = 2021
+
+
+def _rng(seed):
+    return np.random.default_rng(seed)
+
+
+def write_kpi_workbook(path, kpis=10, years=3, kpi_names=(), seed=0):
+    """
+    Workbook with one sheet per year (named '2021', '2022', ...), each with a 'KPI'
+    column, the twelve month names and 'FY Total'. kpi_names come first and are
+    padded with generated names to kpis rows.
+    """
+    rng = _rng(seed)
+    names = list(kpi_names)[:kpis] + [f'KPI {i:03d}' for i in range(len(kpi_names), kpis)]
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for year in range(FIRST_YEAR, FIRST_YEAR + years):
+            values = rng.gamma(2.0, 5000.0, size=(kpis, 12)).round(2)
+            sheet = pd.DataFrame(values, columns=MONTH_NAMES)
+            sheet.insert(0, 'KPI', names)
+            sheet['FY Total'] = values.sum(axis=1).round(2)
+            sheet.to_excel(writer, sheet_name=str(year), index=False)
+
+
+def write_pl_workbook(path, kpis=10, months=18, seed=1):
+    """
+    Profit and loss workbook: 'Sheet1' with 'KPI' plus one 'Month_YYYY' column per
+    month and 'Total', and a 'Profit and Loss' sheet of the same shape. The page
+    reads columns A:S, i.e. the first 18 months.
+    """
+    rng = _rng(seed)
+    labels = [f'{MONTH_NAMES[m % 12]}_{FIRST_YEAR + 1 + m // 12}' for m in range(months)]
+    names = ['Gross Margin', 'Net Margin'] + [f'Line {i:03d}' for i in range(2, kpis)]
+    values = rng.normal(20000.0, 15000.0, size=(kpis, months)).round(2)
+    values[:2] = rng.uniform(-0.2, 0.6, size=(2, months)).round(4)  # Margins are fractions
+    sheet = pd.DataFrame(values[:kpis], columns=labels)
+    sheet.insert(0, 'KPI', names[:kpis])
+    sheet['Total'] = sheet[labels].sum(axis=1)
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        sheet.rename(columns={'KPI': 'Unnamed: 0'}).to_excel(writer, sheet_name='Profit and Loss', index=False)
+        sheet.to_excel(writer, sheet_name='Sheet1', index=False)
+
+
+def write_revenue_csv(path, services=10, years=3, seed=2):
+    """Revenue streams CSV: 'Revenue Stream by Service' (CPT-like codes), the twelve month names and 'Year'."""
+    rng = _rng(seed)
+    codes = 99400 + np.arange(services)
+    frames = []
+    for year in range(FIRST_YEAR, FIRST_YEAR + years):
+        frame = pd.DataFrame(rng.gamma(2.0, 1500.0, size=(services, 12)).round(2), columns=MONTH_NAMES)
+        frame.insert(0, 'Revenue Stream by Service', codes)
+        frame['Year'] = year
+        frames.append(frame)
+    pd.concat(frames, ignore_index=True).to_csv(path, index=False)
+
+
+def _iso(times):
+    return np.char.add(np.datetime_as_string(times, unit='ms'), 'Z')
+
+
+def _local(times):
+    return np.char.add(np.datetime_as_string(times - np.timedelta64(5, 'h'), unit='ms'), ' CDT')
+
+
+def write_call_logs(folder, files=4, rows=25_000, callers=40, seed=3):
+    """
+    Folder of call-log exports (CSV) in the layout of the Sasi folder.
+
+    Each file covers its own stretch of time; about a third of the calls are
+    unanswered ('--:--:--' answer time) and a few have a negative duration, like
+    the real exports.
+    """
+    rng = _rng(seed)
+    os.makedirs(folder, exist_ok=True)
+    nurses = [f'Nurse {i:03d}({i:04d})' for i in range(callers)]
+    start = np.datetime64(f'{FIRST_YEAR + 2}-01-01T08:00:00')
+    for index in range(files):
+        offsets = np.sort(rng.integers(0, 30 * 24 * 3600 * 1000, size=rows))
+        starts = start + np.timedelta64(30 * index, 'D') + offsets.astype('timedelta64[ms]')
+        durations = rng.gamma(1.5, 120.0, size=rows).round().astype(int)
+        ends = starts + (durations * 1000).astype('timedelta64[ms]')
+        answered = rng.random(rows) > 0.35
+        answers = starts + rng.integers(1000, 20000, size=rows).astype('timedelta64[ms]')
+        outbound = rng.random(rows) < 0.57
+        nurse = rng.choice(nurses, size=rows)
+        other = np.char.add(np.char.add('Patient(', rng.integers(2000000000, 9999999999, size=rows).astype(str)), ')')
+        export = pd.DataFrame({
+            'From': np.where(outbound, nurse, other),
+            'To': np.where(outbound, other, nurse),
+            'Start Time': _iso(starts),
+            'Start Time (local)': _local(starts),
+            'Answer Time': np.where(answered, _iso(answers), '--:--:--'),
+            'Answer Time (local)': np.where(answered, _local(answers), '--:--:--'),
+            'End Time': _iso(ends),
+            'End Time (local)': _local(ends),
+            'Duration': np.where(rng.random(rows) < 0.001, -1, durations),
+            'Disposition': rng.choice([16, 20, 21, 26], size=rows, p=[0.6, 0.25, 0.1, 0.05]),
+            'Direction': np.where(outbound, 'OUTBOUND', 'INBOUND'),
+        })
+        export.to_csv(os.path.join(folder, f'medkick-user_activity-synthetic-{index:04d}.csv'), index=False)
+
+
+def generate_dataset(folder, kpis=10, years=3, pl_months=18, services=10, call_files=4, call_rows=25_000, logo=None):
+    """Write every synthetic input into folder under the file names the pages use."""
+    os.makedirs(folder, exist_ok=True)
+    write_kpi_workbook(os.path.join(folder, 'KPI123.xlsx'), kpis, years)
+    write_kpi_workbook(os.path.join(folder, 'finance.xlsx'), kpis, years, kpi_names=REVENUE_KPIS, seed=4)
+    write_pl_workbook(os.path.join(folder, 'Med-Kick_Investment.xlsx'), kpis, pl_months)
+    write_revenue_csv(os.path.join(folder, 'FinDataOutputRevenue.csv'), services, years)
+    write_call_logs(os.path.join(folder, 'Sasi'), call_files, call_rows)
+    if logo:
+        shutil.copy(logo, os.path.join(folder, 'medkicklogo.png'))
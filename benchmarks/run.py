@@ -0,0 +1,364 @@
+"""
+Time the load, filter, aggregate and figure stages of every dashboard page on synthetic data.
+
+Run from the repository root:
+
+    python -m benchmarks.run --scale medium --apptest
+    python -m benchmarks.run --import-budget 400
+    python -m benchmarks.run --scale medium --compare benchmarks/results/<earlier run>.json
+
+The synthetic inputs are generated once per scale under benchmarks/data/ (see
+benchmarks/generators.py). Each stage runs --repeat times; the best and median
+times are printed and saved with the scale and git revision to
+benchmarks/results/, so a later run can be compared against them.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import streamlit.logger
+
+# Loaders and charts use Streamlit caches; outside a server they warn on every use
+streamlit.logger.set_log_level('error')
+
+import altair as alt  # noqa: E402
+import pandas as pd  # noqa: E402
+import plotly.express as px  # noqa: E402
+import streamlit as st  # noqa: E402
+
+from benchmarks.generators import SCALES, generate_dataset  # noqa: E402
+from call_logs import CallLogStore, call_metrics, filter_calls, rollup_call_metrics  # noqa: E402
+from charts import binned_counts, downsample_time_series, histogram_chart, kpi_bar_chart  # noqa: E402
+from data_loader import SIDECAR_DIR, load_revenue_cube, load_sheet_matrix, load_table, load_year_matrix  # noqa: E402
+from datasets import dataset_registry  # noqa: E402
+from kpi_stats import kpi_statistics  # noqa: E402
+from reports import REVENUE_KPIS, combined_expenditure  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, 'benchmarks')
+
+PAGES = {
+    'cost': 'pages/Cost_Management_Dashboard.py',
+    'revenue': 'pages/revenueforecast.py',
+    'pl': 'pages/Profit_Loss_Dashboard.py',
+    'streams': 'pages/FinDataOutputRevenue.py',
+    'calls': 'pages/nursing.py',
+}
+
+
+class StageTimer:
+    """Collects wall-clock samples per (page, stage) and the row counts they processed."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.rows = {}
+
+    @contextmanager
+    def stage(self, page, stage, rows=None):
+        started = time.perf_counter()
+        yield
+        self.samples[page, stage].append(time.perf_counter() - started)
+        if rows is not None:
+            self.rows[page, stage] = rows
+
+    def results(self):
+        return [{
+            'page': page,
+            'stage': stage,
+            'best': min(samples),
+            'median': statistics.median(samples),
+            'repeats': len(samples),
+            'rows': self.rows.get((page, stage)),
+        } for (page, stage), samples in self.samples.items()]
+
+
+def _cold_start():
+    # Drop the in-memory caches, the shared datasets and the on-disk sidecars/call log store
+    st.cache_data.clear()
+    dataset_registry.clear()
+    shutil.rmtree(SIDECAR_DIR, ignore_errors=True)
+
+
+def _figure_json(fig):
+    # Serializing is part of what the browser waits for
+    return fig.to_json() if hasattr(fig, 'to_json') else json.dumps(fig.to_dict(), default=str)
+
+
+def bench_kpi_page(timer, page, load, lowest_excludes='nonpositive', kpi_names=None):
+    _cold_start()
+    with timer.stage(page, 'load (parse)'):
+        kpis = load()
+    dataset_registry.clear()
+    with timer.stage(page, 'load (sidecar)'):
+        kpis = load()
+    with timer.stage(page, 'load (cached)'):
+        kpis = load()
+
+    with timer.stage(page, 'filter', rows=len(kpis.kpis)):
+        selection = kpis.positions(kpis.labels)
+        dff = kpis.to_frame(selection)
+
+    with timer.stage(page, 'aggregate', rows=dff.shape[1] - 1):
+        stats = kpi_statistics(dff, dff.columns[1:], lowest_excludes, kpis.range_totals(selection))
+        combined_expenditure(dff)
+
+    shown = [i for i, name in enumerate(kpis.kpis) if kpi_names is None or name in kpi_names][:3]
+    kpi_bar_chart.clear()
+    with timer.stage(page, 'figures', rows=len(shown)):
+        for i in shown:
+            _figure_json(kpi_bar_chart(dff.iloc[[i]], 'Value', f'Bar Chart for {stats["KPI"].iloc[i]}'))
+
+
+def bench_streams(timer):
+    page = 'streams'
+    _cold_start()
+    with timer.stage(page, 'load (parse)'):
+        df, cube = load_table('FinDataOutputRevenue.csv'), load_revenue_cube('FinDataOutputRevenue.csv')
+    dataset_registry.clear()
+    with timer.stage(page, 'load (sidecar)'):
+        df, cube = load_table('FinDataOutputRevenue.csv'), load_revenue_cube('FinDataOutputRevenue.csv')
+
+    years, services = df['Year'].unique().tolist(), df['Revenue Stream by Service'].unique().tolist()
+    with timer.stage(page, 'filter', rows=len(df)):
+        df_filter = df[df['Year'].isin(years).to_numpy() & df['Revenue Stream by Service'].isin(services).to_numpy()]
+
+    with timer.stage(page, 'aggregate', rows=len(df_filter)):
+        by_service = cube.by_service(services, years).rename_axis('Service')
+        by_month = by_service.sum()
+        proportions = by_service.sum(axis=1)
+
+    with timer.stage(page, 'figures'):
+        _figure_json(px.bar(by_month, x=by_month.index, y=by_month.values))
+        _figure_json(px.pie(proportions, names=proportions.index, values=proportions.values))
+        _figure_json(px.line(by_service.transpose()))
+
+
+def bench_calls(timer):
+    page = 'calls'
+    _cold_start()
+    with timer.stage(page, 'load (parse)'):
+        store = CallLogStore('Sasi')
+        data = store.refresh()
+    with timer.stage(page, 'load (store)', rows=len(data)):
+        store = CallLogStore('Sasi')
+        data = store.refresh()
+    with timer.stage(page, 'load (unchanged)'):
+        data = store.refresh()
+
+    start, end = data['Start Time'].iloc[0].normalize(), data['End Time'].max().normalize() + pd.Timedelta(days=1)
+    callers = list(data['From'].cat.categories[:5])
+    with timer.stage(page, 'filter (all)', rows=len(data)):
+        filtered = filter_calls(data, start, end)
+    with timer.stage(page, 'filter (5 callers)', rows=len(data)):
+        filter_calls(data, start, end, callers)
+
+    with timer.stage(page, 'aggregate (rollup)', rows=len(store.daily_rollup)):
+        rollup_call_metrics(store.daily_rollup, start, end)
+    with timer.stage(page, 'aggregate (calls)', rows=len(filtered)):
+        call_metrics(filtered)
+        filtered['Disposition'].value_counts()
+        filtered['Direction'].value_counts()
+
+    key = (store.version, start, end)
+    for chart in (histogram_chart, downsample_time_series, binned_counts):
+        chart.clear()
+    with timer.stage(page, 'figures', rows=len(filtered)):
+        _figure_json(histogram_chart(filtered['Duration'].to_numpy(), key))
+        series = downsample_time_series(filtered, key, 'Start Time', 'Duration')
+        _figure_json(alt.Chart(series).mark_line().encode(x='Start Time:T', y='Duration:Q'))
+        bins = binned_counts(filtered, key, 'Disposition', 'Duration')
+        _figure_json(alt.Chart(bins).mark_circle().encode(x='Duration:Q', y='Disposition:N', size='Calls:Q'))
+
+
+def bench_apptest(timer, page, script, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    for stage in ('app run (first)', 'app run (rerun)'):
+        app = AppTest.from_file(os.path.join(ROOT, script), default_timeout=timeout)
+        with timer.stage(page, stage):
+            app.run()
+        if app.exception:
+            raise RuntimeError(f'{script} raised: {app.exception[0].value}')
+
+
+# Run in a fresh interpreter with -X importtime: load Streamlit and the data stack every page
+# needs (pandas, pyarrow), warm AppTest up on an empty script, then run the page between two
+# markers so only the page's own imports fall in between
+IMPORT_PROBE = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import pandas, pyarrow
+import streamlit.logger
+streamlit.logger.set_log_level('error')
+from streamlit.testing.v1 import AppTest
+AppTest.from_string('import streamlit as st; st.write(1)').run()
+app = AppTest.from_file(sys.argv[2], default_timeout=float(sys.argv[3]))
+sys.stderr.write('@@page-start\\n')
+app.run()
+sys.stderr.write('@@page-end\\n')
+sys.exit(1 if app.exception else 0)
+"""
+
+# Milliseconds of imports a page may trigger in a fresh server process (beyond Streamlit, pandas
+# and pyarrow); the call page draws Altair charts (st.bar_chart uses Altair too), which alone cost
+# ~400 ms, and styles its table with pandas' Styler
+IMPORT_BUDGET_MS = {'cost': 300, 'revenue': 300, 'pl': 300, 'streams': 300, 'calls': 1000}
+
+
+def page_import_costs(script, timeout):
+    """
+    {module: cumulative ms} of the top-level imports made while running script
+    once in a fresh interpreter (-X importtime), heaviest first.
+    """
+    probe = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORT_PROBE, ROOT, os.path.join(ROOT, script), str(timeout)],
+                           capture_output=True, text=True)
+    lines = probe.stderr.splitlines()
+    if probe.returncode or '@@page-start' not in lines:
+        raise RuntimeError(f'{script} failed in the import probe:\n{probe.stderr[-2000:]}')
+    costs = {}
+    for line in lines[lines.index('@@page-start') + 1:]:
+        if line == '@@page-end':
+            break
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if name.startswith('  '):
+            continue  # Nested under the module that imported it and counted in its cumulative time
+        costs[name.strip()] = int(cumulative) / 1000
+    return dict(sorted(costs.items(), key=lambda item: -item[1]))
+
+
+def check_import_budget(timer, page, script, timeout, budget_ms):
+    """Time the page's cold imports into timer; returns False when they exceed budget_ms."""
+    from streamlit.testing.v1 import AppTest
+
+    # Build the page's sidecars first, so the probe measures a restarted server rather than a first parse
+    AppTest.from_file(os.path.join(ROOT, script), default_timeout=timeout).run()
+    costs = page_import_costs(script, timeout)
+    total = sum(costs.values())
+    timer.samples[page, 'imports (cold)'].append(total / 1000)
+    heaviest = ', '.join(f'{name} {ms:.0f} ms' for name, ms in list(costs.items())[:3])
+    status = 'over budget' if total > budget_ms else 'ok'
+    print(f'{page:<8} cold imports {total:7.0f} ms of {budget_ms:.0f} ms budget: {status} ({heaviest or "none"})')
+    return total <= budget_ms
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_results(results, baseline=None):
+    previous = {(r['page'], r['stage']): r['best'] for r in (baseline or [])}
+    for r in results:
+        line = f"{r['page']:<8} {r['stage']:<20} best {r['best'] * 1000:10.1f} ms  median {r['median'] * 1000:10.1f} ms"
+        if r['rows'] is not None:
+            line += f"  rows {r['rows']:>10}"
+        old = previous.get((r['page'], r['stage']))
+        if old:
+            ratio = r['best'] / old
+            line += f"  x{ratio:.2f} vs baseline" + ('  SLOWER' if ratio > 1.2 else '')
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('pages', nargs='*', metavar='page', help=f"pages to benchmark ({', '.join(PAGES)}; default: all)")
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    for name, default in SCALES['small'].items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, help=f'override the scale (small: {default})')
+    parser.add_argument('--data', help='folder of generated inputs (default: benchmarks/data/<scale>)')
+    parser.add_argument('--regenerate', action='store_true', help='rewrite the synthetic inputs')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--apptest', action='store_true', help="also time whole page runs with Streamlit's AppTest")
+    parser.add_argument('--timeout', type=float, default=600, help='AppTest timeout per run, seconds')
+    parser.add_argument('--import-budget', type=float, nargs='?', const=-1, metavar='MS',
+                        help='check the imports each page makes in a fresh process against a budget in ms '
+                             '(default: IMPORT_BUDGET_MS per page); exits with status 1 when a page exceeds it')
+    parser.add_argument('--compare', help='results file of an earlier run to compare against')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<time>-<revision>.json)')
+    args = parser.parse_args(argv)
+
+    pages = list(dict.fromkeys(args.pages or PAGES))
+    unknown = [page for page in pages if page not in PAGES]
+    if unknown:
+        parser.error(f'unknown page(s) {", ".join(unknown)}; choose from {", ".join(PAGES)}')
+    scale = {name: getattr(args, name) if getattr(args, name) is not None else value
+             for name, value in SCALES[args.scale].items()}
+    data_dir = os.path.abspath(args.data or os.path.join(BENCH_DIR, 'data', args.scale))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if baseline['scale'] != {'name': args.scale, **scale}:
+            print(f"Warning: {args.compare} was run at scale {baseline['scale']}; times are not comparable")
+
+    if args.regenerate or not os.path.exists(os.path.join(data_dir, 'Sasi')):
+        print(f'Generating {args.scale} inputs in {data_dir} ...')
+        shutil.rmtree(data_dir, ignore_errors=True)
+        generate_dataset(data_dir, logo=os.path.join(ROOT, 'medkicklogo.png'), **scale)
+
+    # The pages (and the loaders' sidecars) use paths relative to the working directory;
+    # the repository's modules must stay importable from there
+    output = os.path.abspath(args.output) if args.output else None
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.chdir(data_dir)
+    benches = {
+        'cost': lambda timer: bench_kpi_page(timer, 'cost', lambda: load_year_matrix('KPI123.xlsx')),
+        'revenue': lambda timer: bench_kpi_page(timer, 'revenue', lambda: load_year_matrix('finance.xlsx'), kpi_names=REVENUE_KPIS),
+        'pl': lambda timer: bench_kpi_page(timer, 'pl', lambda: load_sheet_matrix('Med-Kick_Investment.xlsx', 'Sheet1', usecols='A:S'),
+                                           lowest_excludes='zero'),
+        'streams': bench_streams,
+        'calls': bench_calls,
+    }
+    timer = StageTimer()
+    for page in pages:
+        for _ in range(args.repeat):
+            benches[page](timer)
+            if args.apptest:
+                bench_apptest(timer, page, PAGES[page], args.timeout)
+
+    within_budget = True
+    if args.import_budget is not None:
+        for page in pages:
+            budget = IMPORT_BUDGET_MS[page] if args.import_budget < 0 else args.import_budget
+            within_budget &= check_import_budget(timer, page, PAGES[page], args.timeout, budget)
+
+    results = timer.results()
+    print_results(results, baseline and baseline['results'])
+
+    revision = git_revision()
+    output = output or os.path.join(
+        BENCH_DIR, 'results', f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump({
+            'revision': revision,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'scale': {'name': args.scale, **scale},
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'streamlit': st.__version__,
+            'results': results,
+        }, file, indent=2)
+    print(f'Results written to {output}')
+    return 0 if within_budget else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,564 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa  # installed with streamlit
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from data_loader import SIDECAR_DIR, compact_frame
+from datasets import dataset_bytes
+
+CALL_LOG_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+# Phone numbers and "Name(ext)" share these columns, so they are always read as text
+TEXT_COLUMNS = {'From': str, 'To': str}
+
+# Low-cardinality filter columns, held as categoricals in the consolidated call log
+CATEGORY_COLUMNS = ['From', 'To', 'Direction']
+
+# Keys and measures of the per-nurse, per-day rollup; End Time is only set on the
+# rows of single calls that did not end within the day they started
+ROLLUP_KEYS = ['Nurse', 'Direction', 'Day']
+ROLLUP_MEASURES = ['Calls', 'Duration', 'Answered']
+ROLLUP_COLUMNS = ROLLUP_KEYS + ['End Time'] + ROLLUP_MEASURES
+
+# Name of the exported file each stored row came from (kept on disk only)
+SOURCE_COLUMN = '_source_file'
+
+# Timestamps are ISO-8601 UTC strings, with or without fractional seconds;
+# "--:--:--" marks unanswered calls
+TIMESTAMP_COLUMNS = ['Start Time', 'Answer Time', 'End Time']
+UNANSWERED = '--:--:--'
+
+# The exports repeat every timestamp as local-time text; those copies are not
+# stored but rebuilt by with_local_times() for the rows shown or exported
+LOCAL_COLUMNS = [f'{column} (local)' for column in TIMESTAMP_COLUMNS]
+LOCAL_TIME_ZONE = 'America/Chicago'
+
+MANIFEST_VERSION = 3
+
+# Below this many files a process pool costs more to start than it saves
+PARALLEL_MIN_FILES = 8
+
+logger = logging.getLogger(__name__)
+
+
+def parse_export(file_path):
+    """
+    Parse one phone-system export (.csv/.xlsx/.xls).
+
+    Calls the phone system reported with a negative duration are erroneous and
+    dropped. Timestamps become naive UTC datetime64 (the unanswered sentinel
+    becomes NaT), the local-time copies are dropped and Duration is recomputed
+    as End Time - Start Time in seconds.
+    """
+    if file_path.endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(file_path, dtype=TEXT_COLUMNS)
+    else:
+        df = pd.read_csv(file_path, dtype=TEXT_COLUMNS)
+
+    df = df[pd.to_numeric(df['Duration'], errors='coerce') >= 0].drop(columns=LOCAL_COLUMNS, errors='ignore').reset_index(drop=True)
+    for column in TIMESTAMP_COLUMNS:
+        df[column] = pd.to_datetime(df[column], format='ISO8601', errors='coerce', utc=True).dt.tz_localize(None)
+    df['Duration'] = (df['End Time'] - df['Start Time']).dt.total_seconds()
+    return df
+
+
+def _timed_parse(file_path):
+    start = time.perf_counter()
+    df = parse_export(file_path)
+    return df, time.perf_counter() - start
+
+
+def parse_exports(file_paths, parallel=None, max_workers=None):
+    """
+    Parse many exports, in parallel across processes when worthwhile.
+
+    Returns (frames, timings): both lists follow the order of file_paths, timings
+    holding the seconds spent parsing each file. parallel=None picks the process
+    pool only for at least PARALLEL_MIN_FILES files; max_workers defaults to the
+    number of CPUs.
+    """
+    file_paths = list(file_paths)
+    max_workers = max_workers or os.cpu_count() or 1
+    if parallel is None:
+        parallel = len(file_paths) >= PARALLEL_MIN_FILES and max_workers > 1
+
+    if parallel:
+        workers = min(max_workers, len(file_paths))
+        chunksize = max(1, len(file_paths) // (workers * 4))
+        # Not fork: this runs in the threaded Streamlit server, with the store's lock held
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('forkserver')) as executor:
+            # map() yields results in submission order, so the output is deterministic
+            results = list(executor.map(_timed_parse, file_paths, chunksize=chunksize))
+    else:
+        results = [_timed_parse(file_path) for file_path in file_paths]
+
+    frames = [df for df, _ in results]
+    timings = [seconds for _, seconds in results]
+    return frames, timings
+
+
+def nurse_side(calls):
+    """The nurse of each call: the callee ('To') of inbound calls, the caller ('From') of outbound ones."""
+    inbound = (calls['Direction'] == 'INBOUND').to_numpy()
+    return pd.Series(np.where(inbound, calls['To'].astype(str), calls['From'].astype(str)), index=calls.index)
+
+
+def daily_rollup(calls):
+    """
+    Call counts, duration sums and answered counts per nurse x direction x start day.
+
+    Calls that ended later on the day they started are summed per day, so the
+    rollup grows with days x nurses rather than with calls. The few others (across
+    or exactly at midnight) keep a row of their own with their End Time, so date
+    filters answered from the rollup select the same calls as filter_calls().
+    Calls without an End Time never pass a date filter and are left out. Nurse and
+    Direction are categoricals, like the filter columns of the call log.
+    """
+    if len(calls):
+        calls = calls[calls['End Time'].notna().to_numpy()]
+    if not len(calls):
+        return pd.DataFrame(columns=ROLLUP_COLUMNS).astype({'Nurse': 'category', 'Direction': 'category'})
+    day = calls['Start Time'].dt.floor('D')
+    end_time = calls['End Time']
+    same_day = (end_time > day) & (end_time < day + pd.Timedelta(days=1))
+    keyed = pd.DataFrame({
+        'Nurse': nurse_side(calls).astype('category'),
+        'Direction': calls['Direction'].astype(str).astype('category'),
+        'Day': day,
+        'End Time': end_time.where(~same_day),
+        'Calls': 1,
+        'Duration': calls['Duration'].astype(float),  # Summed in float64, even when stored compacted
+        'Answered': calls['Answer Time'].notna().astype(int),
+    })
+    return _sum_rollup(keyed)
+
+
+def _sum_rollup(rollup):
+    # Sum the per-day rows by key; single-call rows (with an End Time) are kept as they are
+    single = rollup['End Time'].notna().to_numpy()
+    summed = rollup[~single].groupby(ROLLUP_KEYS, sort=True, observed=True)[ROLLUP_MEASURES].sum().reset_index()
+    summed['End Time'] = pd.Series(pd.NaT, index=summed.index, dtype=rollup['End Time'].dtype)
+    return pd.concat([summed, rollup[single]], ignore_index=True)[ROLLUP_COLUMNS]
+
+
+def combine_rollups(rollup, added):
+    """The daily_rollup() of two sets of calls, from the daily_rollup() of each."""
+    if not len(added):
+        return rollup
+    if not len(rollup):
+        return added
+    return _sum_rollup(concat_encoded(rollup, added))
+
+
+def merge_calls(data, rows):
+    """
+    The start-time sorted call log data with the sorted rows of new exports merged in.
+
+    Rows starting after the last call of data, the usual case, are appended;
+    otherwise only the tail of data they overlap is re-sorted, stably, so ties
+    keep data first as a rebuild would.
+    """
+    if not len(rows):
+        return data
+    if not len(data):
+        return rows
+    start_times = data['Start Time'].to_numpy()
+    split = start_times.searchsorted(rows['Start Time'].iloc[0], side='right')
+    order = None
+    if split < len(data):
+        tail = np.concatenate([start_times[split:], rows['Start Time'].to_numpy()])
+        order = np.concatenate([np.arange(split), split + np.argsort(tail, kind='stable')])
+    return concat_encoded(data, rows, order)
+
+
+def concat_encoded(data, rows, order=None):
+    """
+    pd.concat([data, rows], ignore_index=True), reordered by the positions in order
+    if given, without re-encoding data.
+
+    pd.concat hashes every category of a categorical column whose categories
+    differ; here the values of rows are found by binary search in data's sorted
+    categories (see _union_codes()). Other columns take the common dtype of both.
+    """
+    columns = {}
+    for column in data.columns:
+        old, new = data[column], rows[column]
+        if isinstance(old.dtype, pd.CategoricalDtype):
+            old_codes, new_codes, dtype = _union_codes(old, new.astype('category'))
+            codes = np.concatenate([old_codes, new_codes])
+            values = pd.Categorical.from_codes(codes if order is None else codes[order], dtype=dtype)
+        else:
+            values = pd.concat([old, new], ignore_index=True)
+            if order is not None:
+                values = values.take(order)
+            values = values.to_numpy() if isinstance(values.dtype, np.dtype) else values.array
+        columns[column] = values
+    return pd.DataFrame(columns)
+
+
+def _union_codes(old, new):
+    """
+    (codes of old, codes of new, dtype) of two categoricals with sorted categories,
+    re-encoded over the sorted union of their categories.
+
+    Only the categories of new are looked up; when some are not in old, the codes
+    of old shift by the number of added categories sorted before theirs.
+    """
+    categories, added = old.cat.categories, new.cat.categories
+    positions = categories.searchsorted(added)
+    found = positions < len(categories)
+    found[found] = categories.take(positions[found]) == added[found]
+    old_codes = old.cat.codes.to_numpy()
+    if found.all():
+        lookup, dtype = positions, old.dtype
+    else:
+        insert_at = positions[~found]
+        kept = np.arange(len(categories))
+        shifted = kept + np.searchsorted(insert_at, kept, side='right')
+        inserted = insert_at + np.arange(len(insert_at))
+        lookup = np.empty(len(added), dtype=np.int64)
+        lookup[found] = shifted[positions[found]]
+        lookup[~found] = inserted
+        union_order = np.empty(len(categories) + len(insert_at), dtype=np.int64)
+        union_order[shifted] = kept
+        union_order[inserted] = len(categories) + np.arange(len(insert_at))
+        dtype = pd.CategoricalDtype(categories.append(added[~found]).take(union_order))
+        old_codes = np.where(old_codes >= 0, shifted[old_codes], -1)
+    new_codes = new.cat.codes.to_numpy()
+    return old_codes, np.where(new_codes >= 0, lookup[new_codes], -1), dtype
+
+
+def file_sha1(file_path, chunk_size=1 << 20):
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class CallLogStore:
+    """
+    Incrementally ingested copy of a folder of call-log exports.
+
+    A manifest records the size, mtime and SHA-1 of every ingested file and the
+    part file its rows were appended to. Each refresh only stats the folder,
+    parses files that are new or whose contents changed, and appends them as a new
+    Arrow part, so its cost depends on the new data rather than the whole history.
+
+    In memory it holds only the consolidated call log and its daily_rollup(). New
+    exports are compacted, rolled up and merged in on their own; when an ingested
+    export is modified or removed, both are rebuilt from the rows of the current
+    files in the parts. release() drops them; the next refresh reads the parts back.
+    """
+
+    def __init__(self, folder_path, store_dir=None, parallel=None, max_workers=None):
+        self.folder_path = folder_path
+        self.parallel = parallel
+        self.max_workers = max_workers
+        self.last_timings = {}  # file name -> parse seconds for the most recent refresh
+        self.version = 0  # Bumped whenever the consolidated call log changes (for cache keys)
+        self.store_dir = store_dir or os.path.join(SIDECAR_DIR, 'call_logs', os.path.basename(os.path.abspath(folder_path)))
+        self.manifest_path = os.path.join(self.store_dir, 'manifest.json')
+        self._lock = threading.Lock()
+        self._manifest = {'version': MANIFEST_VERSION, 'next_part': 0, 'files': {}}
+        self._data = None
+        self.daily_rollup = None
+        self._load_store()
+
+    # -- persistence --------------------------------------------------------
+
+    def _load_store(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if manifest.get('version') != MANIFEST_VERSION:
+            return
+
+        # Lost parts: forget their files so the next refresh ingests them again
+        parts = {entry['part'] for entry in manifest['files'].values()}
+        lost = {part for part in parts if not os.path.exists(os.path.join(self.store_dir, part))}
+        manifest['files'] = {name: entry for name, entry in manifest['files'].items() if entry['part'] not in lost}
+        self._manifest = manifest
+
+    def _read_parts(self):
+        """Rows of every file in the manifest, read back from the parts they were appended to."""
+        files = self._manifest['files']
+        frames = []
+        for part in sorted({entry['part'] for entry in files.values()}):
+            names = [name for name, entry in files.items() if entry['part'] == part]
+            try:
+                table = feather.read_table(os.path.join(self.store_dir, part), memory_map=True)
+            except (OSError, pa.ArrowException) as error:
+                logger.warning('Unreadable call log part %s, its files are ingested again: %s', part, error)
+                for name in names:
+                    del files[name]
+                continue
+            # Rows of files since modified (and appended to a later part) are left out
+            table = table.filter(pc.is_in(table[SOURCE_COLUMN], value_set=pa.array(names)))
+            frames.append(table.drop_columns(SOURCE_COLUMN).to_pandas())
+        return frames
+
+    def _append_part(self, new_frames):
+        part = f"part-{self._manifest['next_part']:06d}.arrow"
+        self._manifest['next_part'] += 1
+        part_df = pd.concat(
+            [frame.assign(**{SOURCE_COLUMN: name}) for name, frame in new_frames.items()],
+            ignore_index=True,
+        )
+        os.makedirs(self.store_dir, exist_ok=True)
+        tmp_path = os.path.join(self.store_dir, f'{part}.tmp')
+        feather.write_feather(part_df, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, os.path.join(self.store_dir, part))
+        return part
+
+    def _write_manifest(self):
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _remove_unreferenced_parts(self):
+        referenced = {entry['part'] for entry in self._manifest['files'].values()}
+        for part in os.listdir(self.store_dir):
+            if part.startswith('part-') and part.endswith('.arrow') and part not in referenced:
+                try:
+                    os.remove(os.path.join(self.store_dir, part))
+                except OSError:
+                    pass
+
+    # -- ingestion ----------------------------------------------------------
+
+    def _scan(self):
+        """Return (new or changed files with their manifest entries, names no longer in the folder)."""
+        files = self._manifest['files']
+        changed = {}
+        seen = set()
+        for filename in sorted(os.listdir(self.folder_path)):
+            if not filename.endswith(CALL_LOG_EXTENSIONS):
+                continue
+            seen.add(filename)
+            stat = os.stat(os.path.join(self.folder_path, filename))
+            entry = files.get(filename)
+            if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                continue
+            sha1 = file_sha1(os.path.join(self.folder_path, filename))
+            if entry and entry['sha1'] == sha1:
+                # Touched but not modified: keep the stored rows
+                entry['mtime_ns'] = stat.st_mtime_ns
+                entry['size'] = stat.st_size
+                continue
+            changed[filename] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': sha1}
+        removed = [name for name in files if name not in seen]
+        return changed, removed
+
+    def refresh(self):
+        """Ingest new or changed exports and return the consolidated call log."""
+        with self._lock:
+            manifest_before = json.dumps(self._manifest, sort_keys=True)
+            loaded = self._data is None
+            stored = loaded and bool(self._manifest['files'])
+            changed, removed = self._scan()
+            replaced = [name for name in changed if name in self._manifest['files']]
+
+            names = list(changed)
+            frames, timings = parse_exports(
+                [os.path.join(self.folder_path, name) for name in names],
+                parallel=self.parallel, max_workers=self.max_workers,
+            )
+            new_frames = dict(zip(names, frames))
+            self.last_timings = dict(zip(names, timings))
+            for name, seconds in self.last_timings.items():
+                logger.info('Parsed %s in %.3fs', name, seconds)
+            if new_frames:
+                part = self._append_part(new_frames)
+                for name, entry in changed.items():
+                    entry['part'] = part
+                    self._manifest['files'][name] = entry
+
+            for name in removed:
+                del self._manifest['files'][name]
+
+            if stored or removed or replaced:
+                # Earlier rows of these files are spread through the call log: rebuild it from the parts
+                self._data = self._consolidate(self._read_parts())
+                self.daily_rollup = daily_rollup(self._data)
+            elif loaded or new_frames:
+                # Only the new rows are compacted and rolled up, then merged into what is held
+                rows = self._consolidate(list(new_frames.values()))
+                if loaded:
+                    self._data, self.daily_rollup = rows, daily_rollup(rows)
+                else:
+                    self._data = merge_calls(self._data, rows)
+                    self.daily_rollup = combine_rollups(self.daily_rollup, daily_rollup(rows))
+            if loaded or new_frames or removed:
+                self.version += 1
+                logger.info('Call log: %d calls, %.2f MB', len(self._data),
+                            dataset_bytes((self._data, self.daily_rollup)) / 2**20)
+
+            if json.dumps(self._manifest, sort_keys=True) != manifest_before:
+                os.makedirs(self.store_dir, exist_ok=True)
+                self._write_manifest()
+                self._remove_unreferenced_parts()
+            return self._data
+
+    def snapshot(self):
+        """(version, consolidated call log, daily rollup) as of the last refresh, read together."""
+        with self._lock:
+            return self.version, self._data, self.daily_rollup
+
+    def release(self):
+        """Drop the call log held in memory; the next refresh() reads it back from the parts."""
+        with self._lock:
+            self._data = self.daily_rollup = None
+        logger.info('Released the call log of %s', self.folder_path)
+
+    @staticmethod
+    def _consolidate(frames):
+        # Exports without calls are left out so they don't turn typed columns into objects
+        frames = [frame for frame in frames if len(frame)] or frames[:1]
+        if not frames:
+            return pd.DataFrame()
+        # Kept sorted by start time so date ranges can be found by binary search
+        data = pd.concat(frames, ignore_index=True).sort_values('Start Time', kind='stable', ignore_index=True)
+        # Categories are sorted, so they double as the filter option lists
+        return compact_frame(data, category_columns=CATEGORY_COLUMNS)
+
+
+def with_local_times(calls):
+    """
+    calls with the exports' '(local)' text columns rebuilt after their timestamps,
+    e.g. '2023-10-02T08:00:41.793 CDT', with '--:--:--' where there is no time.
+
+    Meant for the few rows being shown or exported, not the whole call log.
+    """
+    calls = calls.copy()
+    for column in TIMESTAMP_COLUMNS:
+        local = calls[column].dt.tz_localize('UTC').dt.tz_convert(LOCAL_TIME_ZONE)
+        text = local.dt.strftime('%Y-%m-%dT%H:%M:%S.%f %Z').str.replace(r'(\.\d{3})\d{3}', r'\1', regex=True)
+        calls.insert(calls.columns.get_loc(column) + 1, f'{column} (local)', text.fillna(UNANSWERED))
+    return calls
+
+
+def with_unanswered_marked(calls):
+    """
+    calls with Answer Time as text for display: millisecond timestamps, and '--:--:--'
+    (as in the exports) for unanswered calls instead of a blank.
+    """
+    text = calls['Answer Time'].dt.strftime('%Y-%m-%d %H:%M:%S.%f').str.replace(r'(\.\d{3})\d{3}$', r'\1', regex=True)
+    return calls.assign(**{'Answer Time': text.fillna(UNANSWERED)})
+
+
+def slice_by_start_time(data, start, end):
+    """Rows of a start-time sorted call log with start <= Start Time <= end, found by binary search."""
+    start_times = data['Start Time']
+    lo = start_times.searchsorted(pd.Timestamp(start), side='left')
+    hi = start_times.searchsorted(pd.Timestamp(end), side='right')
+    return data.iloc[lo:hi]
+
+
+def category_mask(values, selected=None):
+    """
+    Boolean mask of rows of a categorical Series whose value is in selected.
+
+    Uses a lookup table indexed by category code instead of comparing strings, so
+    several filters combine with a cheap & of boolean arrays. selected=None keeps
+    every row.
+    """
+    codes = values.cat.codes.to_numpy()
+    if selected is None:
+        return np.ones(len(codes), dtype=bool)
+    lookup = np.zeros(len(values.cat.categories) + 1, dtype=bool)  # Last slot: code -1 (missing)
+    indexer = values.cat.categories.get_indexer(list(selected))
+    lookup[indexer[indexer >= 0]] = True
+    return lookup[codes]
+
+
+def filter_calls(data, start, end, callers=None, callees=None, directions=None):
+    """
+    Calls of a start-time sorted call log that started at or after start and ended by end,
+    restricted to the given callers ('From'), callees ('To') and directions (None: all).
+    """
+    in_range = slice_by_start_time(data, start, end)
+    return in_range[category_mask(in_range['From'], callers) &
+                    category_mask(in_range['To'], callees) &
+                    category_mask(in_range['Direction'], directions) &
+                    (in_range['End Time'] <= pd.Timestamp(end)).to_numpy()]
+
+
+def call_metrics(calls):
+    """Volume and duration metrics of a set of calls (rows of the call log)."""
+    inbound = (calls['Direction'] == 'INBOUND').to_numpy()
+    outbound = (calls['Direction'] == 'OUTBOUND').to_numpy()
+    duration = calls['Duration'].to_numpy(dtype=float)
+    return {
+        'calls': len(calls),
+        'inbound_calls': int(inbound.sum()),
+        'outbound_calls': int(outbound.sum()),
+        'duration': np.nansum(duration),
+        'inbound_duration': np.nansum(duration[inbound]),
+        'outbound_duration': np.nansum(duration[outbound]),
+        'answered': int(calls['Answer Time'].notna().sum()),
+    }
+
+
+def rollup_answers(callers=None, callees=None, directions=None):
+    """
+    Whether a daily_rollup() can answer a filter on callers ('From'), callees ('To')
+    and directions (None: all). The rollup is keyed on the nurse, who is the caller
+    of outbound calls and the callee of inbound ones, so a caller filter needs the
+    directions restricted to OUTBOUND and a callee filter to INBOUND.
+    """
+    def only(direction):
+        return directions is not None and set(directions) <= {direction}
+    return (callers is None or only('OUTBOUND')) and (callees is None or only('INBOUND'))
+
+
+def rollup_rows(rollup, start, end, callers=None, callees=None, directions=None):
+    """
+    Rows of a daily_rollup() for the calls filter_calls() selects with the same
+    arguments (see rollup_answers() for the filters it can express). start and end
+    must be midnights.
+    """
+    if not rollup_answers(callers, callees, directions):
+        raise ValueError('The daily rollup is keyed on the nurse; filter callers with OUTBOUND '
+                         'and callees with INBOUND calls only, or use the raw calls')
+    nurses = None
+    for selected in (callers, callees):
+        if selected is not None:
+            nurses = list(selected) if nurses is None else [nurse for nurse in nurses if nurse in set(selected)]
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    day, end_time = rollup['Day'], rollup['End Time']
+    # Per-day rows end within their start day, so they end by end exactly when they start before it
+    in_range = (day >= start).to_numpy() & np.where(end_time.isna(), day < end, end_time <= end)
+    return rollup[in_range & category_mask(rollup['Nurse'], nurses) & category_mask(rollup['Direction'], directions)]
+
+
+def rollup_call_metrics(rollup, start, end, callers=None, callees=None, directions=None):
+    """
+    call_metrics() of the calls filter_calls() selects with the same arguments, read
+    from a daily_rollup() instead of the individual calls (see rollup_rows()).
+    """
+    rows = rollup_rows(rollup, start, end, callers, callees, directions)
+    by_direction = rows.groupby('Direction', observed=False)[['Calls', 'Duration']].sum()
+    by_direction = by_direction.reindex(['INBOUND', 'OUTBOUND'], fill_value=0)
+    return {
+        'calls': int(rows['Calls'].sum()),
+        'inbound_calls': int(by_direction.loc['INBOUND', 'Calls']),
+        'outbound_calls': int(by_direction.loc['OUTBOUND', 'Calls']),
+        'duration': rows['Duration'].sum(),
+        'inbound_duration': by_direction.loc['INBOUND', 'Duration'],
+        'outbound_duration': by_direction.loc['OUTBOUND', 'Duration'],
+        'answered': int(rows['Answered'].sum()),
+    }
@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Plotly is imported inside the functions that build figures, so importing this
+# module (e.g. for the binning helpers) does not load it
+
+# Shades of the Med-Kick green used for month bars
+MONTH_COLORS = ['#d5f7ef','#c7f4ea','#b9f2e5','#abefdf','#9decda','#8fead5','#74e5cb','#68ceb6','#5cb7a2','#51a08e','#458979','#3a7265','#2e5b51','#22443c']
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def kpi_bar_chart(data, value_name, title, texttemplate='<b>%{y:.0f}</b>', y_label='Cost'):
+    """
+    Bar chart of one KPI row ('KPI' plus one column per month) with a bar per month.
+
+    Memoized across reruns and sessions on a hash of the data and chart options
+    (least recently used figures are evicted past max_entries), so an unchanged
+    KPI/month selection skips Plotly Express entirely.
+    """
+    import plotly.express as px
+
+    # Reshape data for Plotly Express
+    reshaped_data = pd.melt(data, id_vars='KPI', var_name='Month', value_name=value_name)
+
+    # Prepare the data for Plotly Express
+    fig = px.bar(
+        data_frame=reshaped_data,
+        x='Month',
+        y=value_name,
+        color='Month',  # Assign color based on the month
+        color_discrete_sequence=MONTH_COLORS,  # Set the desired color sequence
+        labels={'x': 'Month</b>', 'y': f'{y_label}</b>'},  # Set the x-axis and y-axis labels
+        title=title,
+    )
+
+    # Add value labels on top of the bars
+    fig.update_traces(texttemplate=texttemplate, textposition='outside')
+
+    fig.update_layout(
+        # Make the bar chart title big
+        title_font=dict(size=30),
+        # Adjust the size of the chart
+        autosize=False,
+        width=1100,
+        height=500,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        # Set the font color to dark
+        font=dict(color='black'),
+        # Update x and y labels to bold
+        xaxis_title_font=dict(family='Arial', size=14, color='black'),
+        yaxis_title_font=dict(family='Arial', size=14, color='black'),
+        xaxis_tickfont=dict(family='Arial', size=12, color='black'),
+        yaxis_tickfont=dict(family='Arial', size=12, color='black'),
+    )
+    return fig
+
+
+def binned_histogram(values, bins=20, kde_grid=512):
+    """
+    Histogram counts of values plus a Gaussian KDE curve scaled to the counts.
+
+    The KDE is a binned approximation: values are counted on a fine grid of
+    kde_grid cells and the counts are convolved with a Gaussian kernel (Scott's
+    bandwidth, curve extended 3 bandwidths past the data like seaborn), so the
+    cost after the two np.histogram passes depends on the grid size, not on the
+    number of values. bins may be a count or a NumPy rule such as 'auto'.
+    Returns a dict of arrays: edges, counts, kde_x, kde_y.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    empty = np.array([])
+    if not len(values):
+        return {'edges': empty, 'counts': empty, 'kde_x': empty, 'kde_y': empty}
+
+    counts, edges = np.histogram(values, bins=bins)
+
+    std = values.std(ddof=1) if len(values) > 1 else 0.0
+    bandwidth = std * len(values) ** (-1 / 5)
+    if bandwidth <= 0:
+        return {'edges': edges, 'counts': counts, 'kde_x': empty, 'kde_y': empty}
+
+    lo, hi = values.min() - 3 * bandwidth, values.max() + 3 * bandwidth
+    grid_counts, grid_edges = np.histogram(values, bins=kde_grid, range=(lo, hi))
+    step = grid_edges[1] - grid_edges[0]
+    half_width = min(int(np.ceil(4 * bandwidth / step)), kde_grid)
+    offsets = np.arange(-half_width, half_width + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    # Centre part of the full convolution (mode='same' would follow the kernel's length when it is the longer one)
+    density = np.convolve(grid_counts, kernel)[half_width:half_width + kde_grid] / len(values)
+
+    # Scale the density to the histogram's count axis
+    bin_width = edges[1] - edges[0]
+    kde_y = density * len(values) * bin_width
+    kde_x = (grid_edges[:-1] + grid_edges[1:]) / 2
+    return {'edges': edges, 'counts': counts, 'kde_x': kde_x, 'kde_y': kde_y}
+
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def histogram_chart(_values, cache_key, bins=20, color='#74E5CB', x_title='Duration (seconds)', y_title='Frequency'):
+    """
+    Interactive histogram with a KDE line, built from binned_histogram().
+
+    _values is not hashed (Streamlit skips arguments starting with an underscore);
+    cache_key must identify them instead, e.g. a data version plus the filters
+    that selected them.
+    """
+    import plotly.graph_objects as go
+
+    hist = binned_histogram(_values, bins=bins)
+    edges = hist['edges']
+    fig = go.Figure()
+    if len(edges):
+        fig.add_trace(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=hist['counts'],
+            width=np.diff(edges),
+            marker=dict(color=color, line=dict(color='black', width=1)),
+            name='Count',
+        ))
+    if len(hist['kde_x']):
+        fig.add_trace(go.Scatter(x=hist['kde_x'], y=hist['kde_y'], mode='lines', line=dict(color=color, width=2), name='KDE'))
+    fig.update_layout(
+        xaxis_title=x_title,
+        yaxis_title=y_title,
+        bargap=0,
+        showlegend=False,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+    )
+    return fig
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    x must be sorted ascending. The first and last points are always kept; each of
+    the threshold - 2 buckets in between keeps the point forming the largest
+    triangle with the previously kept point and the average of the next bucket,
+    which preserves peaks and the visual shape of the series.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=int)
+    kept[0] = a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    kept[-1] = n - 1
+    return kept
+
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def downsample_time_series(_data, cache_key, time_column, value_column, max_points=2000):
+    """
+    The time_column/value_column pairs of _data reduced to at most max_points with LTTB.
+
+    _data must be sorted by time_column; rows with a missing time or value are
+    skipped. Like histogram_chart(), _data is identified by cache_key rather than
+    hashed.
+    """
+    series = _data[[time_column, value_column]].dropna()
+    times = series[time_column].to_numpy()
+    x = (times - times[0]) / np.timedelta64(1, 's') if len(times) else times
+    kept = lttb_indices(x, series[value_column].to_numpy(), max_points)
+    return series.iloc[kept].reset_index(drop=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def binned_counts(_data, cache_key, category_column, value_column, bins=40):
+    """
+    Number of rows of _data per (category, value bin), with bins shared by all categories.
+
+    Returns a frame with category_column, value_column (bin midpoint), 'Bin Start',
+    'Bin End' and 'Calls', one row per non-empty bin, so a chart draws a few
+    hundred marks however many rows there are. _data is identified by cache_key.
+    """
+    data = _data[[category_column, value_column]].dropna()
+    columns = [category_column, value_column, 'Bin Start', 'Bin End', 'Calls']
+    if not len(data):
+        return pd.DataFrame(columns=columns)
+
+    edges = np.histogram_bin_edges(data[value_column].to_numpy(dtype=float), bins=bins)
+    bin_index = np.clip(np.searchsorted(edges, data[value_column].to_numpy(dtype=float), side='right') - 1, 0, len(edges) - 2)
+    counts = (
+        pd.DataFrame({category_column: data[category_column].to_numpy(), 'bin': bin_index})
+        .groupby([category_column, 'bin'], sort=True, observed=True)
+        .size()
+        .reset_index(name='Calls')
+    )
+    counts['Bin Start'] = edges[counts['bin']]
+    counts['Bin End'] = edges[counts['bin'] + 1]
+    counts[value_column] = (counts['Bin Start'] + counts['Bin End']) / 2
+    return counts[columns]
@@ -0,0 +1,223 @@
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa  # installed with streamlit
+import pyarrow.feather as feather
+
+from datasets import shared_dataset
+from kpi_store import MONTH_YEAR, YEAR_MONTH, KpiMatrix, RevenueCube
+
+# Columnar sidecar copies of the source files live here (override with MEDKICK_CACHE_DIR)
+SIDECAR_DIR = os.environ.get('MEDKICK_CACHE_DIR', '.cache')
+
+# Bumped when what the sidecars hold changes (2: compacted dtypes), so older ones are rebuilt
+SIDECAR_FORMAT = 2
+
+# Text columns with at most this many distinct values per row are stored as categoricals
+MAX_CATEGORY_RATIO = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+def file_signature(file_path):
+    # Path plus modification time and size identify one version of a file on disk,
+    # so cached results are reused until the file is replaced or edited
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+
+def _digest(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+
+def sidecar_path(file_path, tag=''):
+    """Path of the sidecar holding the current version of file_path (tag separates different parses of one file)."""
+    abs_path, mtime_ns, size = file_signature(file_path)
+    prefix = f'{os.path.basename(file_path)}.{_digest(abs_path, tag)}'
+    return os.path.join(SIDECAR_DIR, f'{prefix}.{_digest(mtime_ns, size, SIDECAR_FORMAT)}.arrow')
+
+
+def read_via_sidecar(file_path, parse, tag=''):
+    """
+    Return parse(file_path), going through an uncompressed Arrow (Feather v2) sidecar.
+
+    The first call for a given version of the source writes the sidecar; later calls,
+    including after a restart, memory-map it instead of re-parsing the Excel/CSV file.
+    Sidecars of older versions of the same source are removed when a new one is written.
+    """
+    path = sidecar_path(file_path, tag)
+    if os.path.exists(path):
+        try:
+            return feather.read_table(path, memory_map=True).to_pandas()
+        except (OSError, pa.ArrowException):
+            pass  # Unreadable sidecar (e.g. partially written); rebuild it below
+
+    df = parse(file_path)
+    tmp_path = None
+    try:
+        os.makedirs(SIDECAR_DIR, exist_ok=True)
+        # A private temporary file: threads and loaders writing the same sidecar never share one
+        fd, tmp_path = tempfile.mkstemp(dir=SIDECAR_DIR, prefix=os.path.basename(path) + '.', suffix='.tmp')
+        os.close(fd)
+        feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+    except (OSError, ValueError, pa.ArrowException) as error:
+        # Columns Arrow cannot type (mixed objects) or a read-only disk: serve the parsed frame as is
+        logger.warning('No sidecar for %s, it will be parsed again on the next cold load: %s', file_path, error)
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return df
+
+    stale_pattern = path.rsplit('.', 2)[0] + '.*.arrow'
+    for stale in glob.glob(stale_pattern):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return df
+
+
+def text_labels(df):
+    """
+    df with its first (label) column as text, like call_logs.TEXT_COLUMNS.
+
+    Workbook KPI columns mix numbers (CPT codes such as 99426) with names, which
+    Arrow cannot store in one column; missing labels stay missing.
+    """
+    labels = df[df.columns[0]]
+    if not pd.api.types.is_object_dtype(labels):
+        return df
+    return df.assign(**{df.columns[0]: labels.where(labels.isna(), labels.astype(str))})
+
+
+def compact_frame(df, category_columns=(), max_category_ratio=MAX_CATEGORY_RATIO):
+    """
+    df with the smallest dtypes that hold the same values.
+
+    Integer columns get the narrowest integer type their range fits, float columns
+    become float32 only where every value survives the round trip (amounts in
+    cents usually do not), and text columns become categoricals when listed in
+    category_columns or repetitive enough (distinct values at most
+    max_category_ratio of the rows). Other columns are left as they are.
+    """
+    compacted = {}
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(values):
+            continue
+        if pd.api.types.is_integer_dtype(values):
+            narrow = pd.to_numeric(values, downcast='integer')
+        elif pd.api.types.is_float_dtype(values):
+            narrow = values.astype(np.float32)
+            if not np.array_equal(narrow.to_numpy(dtype=float), values.to_numpy(dtype=float), equal_nan=True):
+                continue
+        elif pd.api.types.is_string_dtype(values) or pd.api.types.is_object_dtype(values):
+            if column not in category_columns and values.nunique() > max_category_ratio * len(values):
+                continue
+            narrow = values.astype('category')
+        else:
+            continue
+        if narrow.dtype != values.dtype:
+            compacted[column] = narrow
+    return df.assign(**compacted) if compacted else df
+
+
+def assemble_year_sheets(year_sheets):
+    """
+    Combine {year: sheet frame with 'KPI' first} into one frame with 'YYYY_Month' columns.
+
+    Sheets are aligned on their KPI index and joined in a single concatenation, so
+    the cost grows linearly with the number of years. KPI rows absent from a year
+    sheet are logged and listed in the result's attrs['missing_kpis'] ({year: [KPI, ...]}).
+    """
+    frames = []
+    for year, sheet in year_sheets.items():
+        frame = sheet.set_index(sheet.columns[0])
+        frame.columns = [f'{year}_{col}' for col in frame.columns]
+        frames.append(frame)
+
+    # Outer join on KPI with sorted keys, like chained outer merges on 'KPI'
+    df = pd.concat(frames, axis=1, join='outer', sort=True).rename_axis('KPI').reset_index()
+
+    missing_kpis = {}
+    for year, frame in zip(year_sheets, frames):
+        missing = df['KPI'][~df['KPI'].isin(frame.index)].tolist()
+        if missing:
+            missing_kpis[year] = missing
+            logger.warning('KPI rows missing from year sheet %s: %s', year, ', '.join(map(str, missing)))
+    df.attrs['missing_kpis'] = missing_kpis
+    return df
+
+
+def _parse_year_workbook(file_path, usecols, nrows):
+    excel_file = pd.ExcelFile(file_path)
+
+    year_sheets = {}
+    for year_sheet in excel_file.sheet_names:
+        if year_sheet.isdigit():  # Check if the sheet name is a year (numeric)
+            year_sheets[year_sheet] = pd.read_excel(io=excel_file, sheet_name=year_sheet, skiprows=[], usecols=usecols, nrows=nrows)
+    return assemble_year_sheets(year_sheets)
+
+
+def read_table(file_path):
+    """Parse a single .xlsx/.xls/.csv file into a DataFrame."""
+    if file_path.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(file_path)
+    return pd.read_csv(file_path)
+
+
+def _read_year_workbook(file_path, usecols, nrows):
+    return read_via_sidecar(file_path, lambda path: compact_frame(text_labels(_parse_year_workbook(path, usecols, nrows))),
+                            tag=f'years:{usecols}:{nrows}')
+
+
+def _read_sheet(file_path, sheet_name, usecols, nrows):
+    return read_via_sidecar(
+        file_path,
+        lambda path: compact_frame(text_labels(pd.read_excel(io=path, engine="openpyxl", sheet_name=sheet_name, skiprows=[], usecols=usecols, nrows=nrows))),
+        tag=f'sheet:{sheet_name}:{usecols}:{nrows}',
+    )
+
+
+def _shared(kind, file_path, params, build):
+    # One read-only copy per version of the file, shared by all sessions (see datasets.py)
+    abs_path, mtime_ns, size = file_signature(file_path)
+    return shared_dataset((kind, abs_path, *params), (mtime_ns, size), build)
+
+
+def load_sheet(file_path, sheet_name, usecols="A:S", nrows=100):
+    """Load a single sheet of a workbook."""
+    return _shared('sheet', file_path, (sheet_name, usecols, nrows),
+                   lambda: _read_sheet(file_path, sheet_name, usecols, nrows))
+
+
+def load_year_matrix(file_path, usecols="A:M", nrows=100):
+    """Load a KPI workbook's year sheets as a KpiMatrix labelled 'YYYY_Month'."""
+    return _shared('year_matrix', file_path, (usecols, nrows),
+                   lambda: KpiMatrix.from_wide(_read_year_workbook(file_path, usecols, nrows), YEAR_MONTH))
+
+
+def load_sheet_matrix(file_path, sheet_name, usecols="A:S", nrows=100):
+    """Load a 'KPI' plus 'Month_YYYY' columns sheet as a KpiMatrix."""
+    return _shared('sheet_matrix', file_path, (sheet_name, usecols, nrows),
+                   lambda: KpiMatrix.from_wide(_read_sheet(file_path, sheet_name, usecols, nrows), MONTH_YEAR))
+
+
+def _read_table(file_path):
+    return read_via_sidecar(file_path, lambda path: compact_frame(text_labels(read_table(path))), tag='table')
+
+
+def load_table(file_path):
+    """Load a whole .xlsx/.xls/.csv file."""
+    return _shared('table', file_path, (), lambda: _read_table(file_path))
+
+
+def load_revenue_cube(file_path):
+    """Load the revenue streams CSV as a RevenueCube (service x year x month)."""
+    return _shared('revenue_cube', file_path, (), lambda: RevenueCube.from_table(_read_table(file_path)))
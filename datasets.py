@@ -0,0 +1,185 @@
+import logging
+import os
+import threading
+import weakref
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Session state key prefix of the leases a session holds
+_LEASE_PREFIX = '_dataset_lease:'
+
+# Memory the shared datasets may use, in MB (unset: no limit). Over it, datasets no
+# session holds are dropped (they reload from their sidecars when next needed)
+MEMORY_BUDGET_MB = float(os.environ.get('MEDKICK_MEMORY_BUDGET_MB') or 0) or None
+
+logger = logging.getLogger(__name__)
+
+
+def dataset_bytes(dataset):
+    """
+    Memory held by a dataset: a DataFrame (including its text), anything with nbytes
+    (such as a KpiMatrix) or a tuple of those.
+    """
+    if isinstance(dataset, tuple):
+        return sum(dataset_bytes(part) for part in dataset)
+    if isinstance(dataset, pd.DataFrame):
+        return int(dataset.memory_usage(index=True, deep=True).sum())
+    return int(getattr(dataset, 'nbytes', 0))
+
+
+class Lease:
+    """
+    A session's hold on one version of a shared dataset.
+
+    The dataset stays registered while any lease on its version exists; dropping
+    the lease (replacing it with one on a newer version, or the session ending)
+    releases it.
+    """
+
+    def __init__(self, registry, name, version, dataset):
+        self.name = name
+        self.version = version
+        self.dataset = dataset
+        weakref.finalize(self, registry._release, name, version)
+
+
+class DatasetRegistry:
+    """
+    One read-only copy of each dataset version, shared by every session of the server process.
+
+    acquire(name, version, build) returns a Lease on the dataset, building it (once,
+    even when sessions ask concurrently) if that version is not loaded yet. The
+    newest version requested becomes the current one; older versions are retired
+    as soon as the last session holding a lease on them lets go, so memory tracks
+    the number of versions in use rather than the number of sessions.
+
+    With a memory_budget (bytes), loading a dataset that takes the total over it
+    first drops the least recently acquired datasets no session holds (calling their
+    on_evict, for datasets whose owner must let go of them too); leased datasets
+    are never dropped, so the budget is a target rather than a hard cap.
+
+    Datasets are shared objects: callers must not modify them in place.
+    """
+
+    def __init__(self, memory_budget=None):
+        self.memory_budget = memory_budget
+        self._lock = threading.Lock()
+        self._clock = 0  # Acquisition counter, for least recently used order
+        self._entries = {}  # (name, version) -> {'dataset', 'bytes', 'on_evict', 'leases', 'used'}
+        self._current = {}  # name -> version
+        self._build_locks = {}  # (name, version) -> lock held while building
+
+    def acquire(self, name, version, build, on_evict=None):
+        key = (name, version)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:  # Other datasets can be acquired while this one builds
+            with self._lock:
+                # Leased where it is found, so no other thread can evict or retire it first
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._lease(entry)
+            built = entry is None
+            if built:
+                dataset = build()
+                size = dataset_bytes(dataset)
+                logger.info('Loaded %s (version %s): %.2f MB', name, version, size / 2**20)
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is None:
+                        entry = self._entries[key] = {'dataset': dataset, 'bytes': size, 'on_evict': on_evict, 'leases': 0}
+                    self._lease(entry)
+        evicted = []
+        with self._lock:
+            self._build_locks.pop(key, None)
+            previous = self._current.get(name)
+            self._current[name] = version
+            if previous is not None and previous != version:
+                self._retire_if_unused(name, previous)
+            if built and self.memory_budget is not None:
+                evicted = self._enforce_budget()
+            lease = Lease(self, name, version, entry['dataset'])
+        for on_evict in evicted:  # Outside the lock: owners take their own locks
+            on_evict()
+        return lease
+
+    def _lease(self, entry):
+        # Called with the lock held
+        self._clock += 1
+        entry['leases'] += 1
+        entry['used'] = self._clock
+
+    def _release(self, name, version):
+        with self._lock:
+            entry = self._entries.get((name, version))
+            if entry is not None:
+                entry['leases'] -= 1
+                self._retire_if_unused(name, version)
+
+    def _retire_if_unused(self, name, version):
+        # Called with the lock held; the current version stays loaded for the next session
+        entry = self._entries.get((name, version))
+        if entry is not None and entry['leases'] <= 0 and self._current.get(name) != version:
+            del self._entries[name, version]
+
+    def _enforce_budget(self):
+        # Called with the lock held; returns the on_evict callbacks of the dropped datasets
+        total = sum(entry['bytes'] for entry in self._entries.values())
+        idle = sorted((entry['used'], key) for key, entry in self._entries.items() if entry['leases'] <= 0)
+        evicted = []
+        for _, key in idle:
+            if total <= self.memory_budget:
+                break
+            entry = self._entries.pop(key)
+            total -= entry['bytes']
+            if entry['on_evict'] is not None:
+                evicted.append(entry['on_evict'])
+            logger.info('Dropped %s (version %s) to stay within the memory budget', *key)
+        if total > self.memory_budget:
+            logger.warning('Shared datasets in use take %.1f MB, over the %.1f MB budget',
+                           total / 2**20, self.memory_budget / 2**20)
+        return evicted
+
+    def datasets(self):
+        """(name, version, leases, is current, dataset) of every loaded dataset version."""
+        with self._lock:
+            return [(name, version, entry['leases'], self._current.get(name) == version, entry['dataset'])
+                    for (name, version), entry in self._entries.items()]
+
+    def memory_usage(self):
+        """Bytes held by each loaded dataset version, largest first, as a frame with the lease counts."""
+        with self._lock:
+            rows = [{'Dataset': name[0] if isinstance(name, tuple) else name,
+                     'Source': os.path.basename(str(name[1])) if isinstance(name, tuple) and len(name) > 1 else '',
+                     'Version': version, 'Sessions': entry['leases'], 'Bytes': entry['bytes']}
+                    for (name, version), entry in self._entries.items()]
+        return pd.DataFrame(rows, columns=['Dataset', 'Source', 'Version', 'Sessions', 'Bytes']).sort_values('Bytes', ascending=False)
+
+
+@st.cache_resource(show_spinner=False)
+def dataset_registry():
+    """The registry shared by all sessions of this server process."""
+    return DatasetRegistry(MEMORY_BUDGET_MB * 2**20 if MEMORY_BUDGET_MB else None)
+
+
+def shared_dataset(name, version, build, on_evict=None):
+    """
+    The shared copy of dataset name at version, built with build() if no session has loaded it yet.
+    on_evict() is called if the registry drops it to stay within the memory budget.
+
+    Inside a Streamlit session the lease is kept in session state, so the session
+    holds exactly one version per dataset until it sees a newer one or ends.
+    Outside one (scripts, batch jobs) the registry just keeps the current version.
+    """
+    lease_key = _LEASE_PREFIX + repr(name)
+    in_session = get_script_run_ctx(suppress_warning=True) is not None
+    if in_session:
+        lease = st.session_state.get(lease_key)
+        if lease is not None and lease.version == version:
+            return lease.dataset
+    lease = dataset_registry().acquire(name, version, build, on_evict)
+    if in_session:
+        st.session_state[lease_key] = lease  # Drops the lease on the previous version, if any
+    return lease.dataset
@@ -0,0 +1,123 @@
+import os
+import shutil
+import time
+import uuid
+
+import pyarrow as pa  # installed with streamlit
+import pyarrow.parquet as pq
+import streamlit as st
+
+# Rows converted per chunk; bounds the size of the text/Arrow buffers held at once
+CHUNK_ROWS = 50_000
+
+EXPORT_FORMATS = {'csv': 'CSV', 'parquet': 'Parquet'}
+
+# Exports are written under the app's static folder and downloaded from Streamlit's
+# static file server (server.enableStaticServing in .streamlit/config.toml), which
+# streams them from disk at app/static/...
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+EXPORT_DIR = os.path.join(STATIC_DIR, 'exports')
+
+# Export files are removed this long after they were written
+EXPORT_TTL_SECONDS = 15 * 60
+
+# Streamlit does not serve static files larger than this (MAX_APP_STATIC_FILE_SIZE)
+MAX_EXPORT_BYTES = 200 * 2**20
+
+
+def iter_chunks(data, chunk_rows=CHUNK_ROWS, derive=None):
+    """
+    Consecutive row slices of data (views, not copies) of at most chunk_rows rows,
+    passed through derive(chunk) if given (to add computed columns a chunk at a time).
+    """
+    for start in range(0, len(data), chunk_rows):
+        chunk = data.iloc[start:start + chunk_rows]
+        yield derive(chunk) if derive is not None else chunk
+
+
+def iter_csv(data, chunk_rows=CHUNK_ROWS, derive=None):
+    """CSV bytes of data without the index, yielded a chunk of rows at a time (header first)."""
+    header = data.iloc[:0] if derive is None else derive(data.iloc[:0])
+    yield header.to_csv(index=False).encode()
+    for chunk in iter_chunks(data, chunk_rows, derive):
+        yield chunk.to_csv(index=False, header=False).encode()
+
+
+def write_export(data, file, fmt='csv', chunk_rows=CHUNK_ROWS, derive=None):
+    """
+    Write data to the binary file object file as 'csv' or 'parquet', chunk by chunk.
+
+    CSV text is encoded and written per chunk; Parquet gets one row group per chunk.
+    Neither builds the complete output in memory while writing. derive(chunk), if given, adds
+    computed columns to each chunk before it is written.
+    """
+    if fmt == 'csv':
+        for block in iter_csv(data, chunk_rows, derive):
+            file.write(block)
+    elif fmt == 'parquet':
+        schema = pa.Schema.from_pandas(data.iloc[:0] if derive is None else derive(data.iloc[:0]), preserve_index=False)
+        with pq.ParquetWriter(file, schema) as writer:
+            for chunk in iter_chunks(data, chunk_rows, derive):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    else:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+
+
+def publish_export(data, file_stem, fmt='csv', chunk_rows=CHUNK_ROWS, derive=None):
+    """
+    data written by write_export() to EXPORT_DIR/<random id>/<file_stem>.<fmt>; returns the path.
+
+    Each export gets a directory of its own, so concurrent exports never collide and
+    a file can only be reached through the link to it. Exports older than
+    EXPORT_TTL_SECONDS are removed first.
+    """
+    remove_expired_exports()
+    directory = os.path.join(EXPORT_DIR, uuid.uuid4().hex)
+    os.makedirs(directory)
+    path = os.path.join(directory, f'{file_stem}.{fmt}')
+    with open(path, 'wb') as file:
+        write_export(data, file, fmt, chunk_rows, derive)
+    return path
+
+
+def remove_expired_exports(ttl_seconds=EXPORT_TTL_SECONDS):
+    """Remove the export directories written more than ttl_seconds ago."""
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    cutoff = time.time() - ttl_seconds
+    for entry in os.scandir(EXPORT_DIR):
+        if entry.is_dir() and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def export_url(path):
+    """Relative URL of a file under STATIC_DIR on Streamlit's static file server."""
+    return 'app/static/' + os.path.relpath(path, STATIC_DIR).replace(os.sep, '/')
+
+
+def export_buttons(data, file_stem, key, formats=('csv', 'parquet'), derive=None):
+    """
+    Buttons that export data in each of formats.
+
+    Clicking one writes the export to disk chunk by chunk (see publish_export()) and
+    shows a link to download it. Streamlit's static file server streams the file
+    from disk, so no copy of the export is held in server memory. The link is
+    shown until the next rerun, and the file is kept for EXPORT_TTL_SECONDS.
+    """
+    if not st.get_option('server.enableStaticServing'):
+        st.warning('Exports need static file serving (server.enableStaticServing in .streamlit/config.toml).')
+        return
+    columns = st.columns(len(formats))
+    for column, fmt in zip(columns, formats):
+        label = EXPORT_FORMATS[fmt]
+        if not column.button(f'Export {label}', key=f'{key}_{fmt}', disabled=not len(data)):
+            continue
+        path = publish_export(data, file_stem, fmt, derive=derive)
+        size = os.path.getsize(path)
+        if size > MAX_EXPORT_BYTES:
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            column.warning(f'The {label} export is {size / 2**20:,.0f} MB, over the '
+                           f'{MAX_EXPORT_BYTES / 2**20:,.0f} MB download limit; narrow the selection.')
+            continue
+        column.markdown(f'<a href="{export_url(path)}" download>Download {os.path.basename(path)}</a> '
+                        f'({size / 2**20:,.1f} MB)', unsafe_allow_html=True)
@@ -0,0 +1,64 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+STAT_COLUMNS = ['KPI', 'total', 'average', 'median', 'highest', 'highest_month', 'lowest', 'lowest_month']
+
+
+def kpi_statistics(df, month_columns, lowest_excludes='nonpositive', range_totals=None):
+    """
+    Summary statistics for every KPI row of df over month_columns, in one pass over the KPI x month matrix.
+
+    Returns a frame aligned with the rows of df with the columns of STAT_COLUMNS:
+    total of all months, average and median of the non-missing months, highest
+    monthly value and its month, and lowest monthly value and its month. Missing
+    months count as 0 for highest/lowest; months excluded from the lowest value
+    are those <= 0 (lowest_excludes='nonpositive', costs) or == 0
+    (lowest_excludes='zero', P&L lines that can be negative).
+
+    range_totals, as returned by KpiMatrix.range_totals(), supplies precomputed
+    (totals, non-missing counts) per KPI for the total and average.
+    """
+    month_columns = list(month_columns)
+    values = df[month_columns].to_numpy(dtype=float)
+    n_kpis = len(values)
+    if not month_columns:
+        stats = pd.DataFrame({column: np.full(n_kpis, np.nan, dtype=object if column.endswith('_month') else float)
+                              for column in STAT_COLUMNS[1:]})
+        stats.insert(0, 'KPI', df['KPI'].to_numpy())
+        return stats
+
+    monthly = np.nan_to_num(values, nan=0.0)
+    rows = np.arange(n_kpis)
+    labels = np.asarray(month_columns, dtype=object)
+
+    if range_totals is None:
+        total = monthly.sum(axis=1)
+        counts = (~np.isnan(values)).sum(axis=1)
+    else:
+        total, counts = range_totals
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)  # All-missing KPI rows give NaN
+        average = np.where(counts > 0, total / counts, np.nan)
+        median = np.nanmedian(values, axis=1)
+
+    highest_idx = monthly.argmax(axis=1)
+
+    if lowest_excludes == 'zero':
+        eligible = monthly != 0
+    else:
+        eligible = monthly > 0
+    lowest_idx = np.where(eligible, monthly, np.inf).argmin(axis=1)
+    has_lowest = eligible.any(axis=1)
+
+    return pd.DataFrame({
+        'KPI': df['KPI'].to_numpy(),
+        'total': total,
+        'average': average,
+        'median': median,
+        'highest': monthly[rows, highest_idx],
+        'highest_month': labels[highest_idx],
+        'lowest': np.where(has_lowest, monthly[rows, lowest_idx], np.nan),
+        'lowest_month': np.where(has_lowest, labels[lowest_idx], None),
+    })
@@ -0,0 +1,211 @@
+import calendar
+
+import numpy as np
+import pandas as pd
+
+MONTH_NAMES = list(calendar.month_name)[1:]
+_MONTH_NUMBERS = {name: number for number, name in enumerate(MONTH_NAMES, start=1)}
+
+# Column label formats used by the workbooks
+YEAR_MONTH = '{year}_{month}'  # KPI123.xlsx / finance.xlsx year sheets, e.g. '2022_March'
+MONTH_YEAR = '{month}_{year}'  # Med-Kick_Investment.xlsx, e.g. 'March_2022'
+
+# Revenue streams CSV (FinDataOutputRevenue.csv): one row per service and year, one column per month
+SERVICE_COLUMN = 'Revenue Stream by Service'
+
+
+def period_ordinal(year, month):
+    """Integer index of a calendar month (consecutive months differ by 1)."""
+    return int(year) * 12 + int(month) - 1
+
+
+def ordinal_year_month(ordinal):
+    """(year, month number) of a period ordinal."""
+    year, month0 = divmod(int(ordinal), 12)
+    return year, month0 + 1
+
+
+def parse_period(label):
+    """Period ordinal of a 'YYYY_Month' or 'Month_YYYY' column label, or None if it is not one."""
+    first, _, second = str(label).partition('_')
+    year, month = (first, second) if first.isdigit() else (second, first)
+    if not year.isdigit() or month not in _MONTH_NUMBERS:
+        return None
+    return period_ordinal(year, _MONTH_NUMBERS[month])
+
+
+class KpiMatrix:
+    """
+    KPI x month values on an integer period axis.
+
+    values[k, p] is KPI k in month periods[p] (NaN where the workbook has no
+    value), so a contiguous range of months is a slice of the array instead of a
+    scan over 'YYYY_Month' column names. periods holds, in order, only the months
+    the workbook has columns for: a year without a sheet adds no empty months.
+    label_format only controls how months are shown.
+
+    Prefix sums of the values and of the non-missing month counts are built once
+    per matrix, so the total and count of any contiguous range of months (the
+    months picked on a page, or a quarter or year of a batch report) come from
+    two lookups per KPI.
+
+    values keep the float32 dtype of compacted sheets; the prefix sums and the
+    frames handed out are float64, as if the values had been loaded as float64.
+    """
+
+    def __init__(self, kpis, periods, values, label_format=YEAR_MONTH, missing_kpis=None):
+        self.missing_kpis = missing_kpis or {}  # year -> KPIs absent from that year's sheet
+        self.kpis = pd.Index(kpis, dtype=object)
+        self.periods = np.asarray(periods, dtype=int)
+        values = np.asarray(values)
+        self.values = np.array(values, dtype=np.result_type(values.dtype, np.float32))
+        self.label_format = label_format
+        self.labels = [self.label(period) for period in self.periods]
+        self._positions = {label: position for position, label in enumerate(self.labels)}
+
+        # cumulative[:, p] is the sum of the first p months (missing months count as 0)
+        present = ~np.isnan(self.values)
+        count_dtype = np.min_scalar_type(self.values.shape[1])
+        self.cumulative = np.hstack([np.zeros((len(self.values), 1)),
+                                     np.cumsum(np.where(present, self.values, 0), axis=1, dtype=float)])
+        self.cumulative_count = np.hstack([np.zeros((len(self.values), 1), dtype=count_dtype),
+                                           np.cumsum(present, axis=1, dtype=count_dtype)])
+
+        # Loaded matrices are shared by every session (see datasets.py)
+        for array in (self.periods, self.values, self.cumulative, self.cumulative_count):
+            array.flags.writeable = False
+
+    @classmethod
+    def from_wide(cls, df, label_format=YEAR_MONTH):
+        """Build from a frame with a 'KPI' column and one column per month label."""
+        columns = [column for column in df.columns[1:] if parse_period(column) is not None]
+        periods, positions = np.unique([parse_period(column) for column in columns], return_inverse=True)
+        dtype = np.result_type(np.float32, *(df[column].dtype for column in columns))
+        values = np.full((len(df), len(periods)), np.nan, dtype=dtype)
+        values[:, positions] = df[columns].to_numpy(dtype=dtype)
+        return cls(df['KPI'].to_numpy(), periods, values, label_format, df.attrs.get('missing_kpis'))
+
+    @property
+    def first_period(self):
+        return int(self.periods[0])
+
+    @property
+    def last_period(self):
+        return int(self.periods[-1])
+
+    @property
+    def nbytes(self):
+        """Memory held by the values, prefix sums and KPI names."""
+        return self.values.nbytes + self.cumulative.nbytes + self.cumulative_count.nbytes + self.kpis.memory_usage(deep=True)
+
+    def label(self, period):
+        year, month = ordinal_year_month(period)
+        return self.label_format.format(year=year, month=calendar.month_name[month])
+
+    def positions(self, labels):
+        """Sorted positions of the given month labels; labels outside the data are ignored."""
+        positions = sorted({self._positions[label] for label in labels if label in self._positions})
+        if positions and positions[-1] - positions[0] + 1 == len(positions):
+            return slice(positions[0], positions[-1] + 1)  # Contiguous: a view, no fancy indexing
+        return np.array(positions, dtype=int)
+
+    def to_frame(self, positions=slice(None)):
+        """Wide frame ('KPI' plus one column per month label) for the given month positions."""
+        labels = np.asarray(self.labels, dtype=object)[positions]
+        frame = pd.DataFrame(self.values[:, positions].astype(float), columns=list(labels))
+        frame.insert(0, 'KPI', self.kpis)
+        return frame
+
+    def range_totals(self, positions):
+        """
+        (totals, counts) per KPI over a contiguous position slice, from the prefix sums.
+
+        counts is the number of non-missing months. Returns None when positions is not
+        a slice (a non-contiguous month selection), which callers sum directly instead.
+        """
+        if not isinstance(positions, slice):
+            return None
+        start, stop, _ = positions.indices(self.values.shape[1])
+        stop = max(start, stop)
+        totals = self.cumulative[:, stop] - self.cumulative[:, start]
+        counts = self.cumulative_count[:, stop] - self.cumulative_count[:, start]
+        return totals, counts
+
+
+class RevenueCube:
+    """
+    Revenue per service x year x month.
+
+    values[s, y, m] is the revenue of services[s] in month m + 1 of years[y], summed
+    over the CSV rows of that service and year (0 where there are none, or the
+    value is missing); present[s, y] tells whether there were any rows. Services
+    are sorted, like the keys of a groupby.
+
+    Built once per version of the revenue streams CSV, so the revenue of any
+    selection of years and services is a sum over one axis of a small array
+    rather than a filter and groupby over the rows.
+    """
+
+    def __init__(self, services, years, values, present):
+        self.services = pd.Index(services, dtype=object, name=SERVICE_COLUMN)
+        self.years = np.asarray(years, dtype=int)
+        self.values = np.array(values, dtype=float)
+        self.present = np.array(present, dtype=bool)
+        # Loaded cubes are shared by every session (see datasets.py)
+        self.values.flags.writeable = False
+        self.present.flags.writeable = False
+
+    @classmethod
+    def from_table(cls, df, service_column=SERVICE_COLUMN):
+        """Build from the revenue streams CSV: service_column, 'Year' and the twelve month names."""
+        df = df[df[service_column].notna() & df['Year'].notna()]
+        service_names = df[service_column].astype(str).to_numpy()
+        year_numbers = df['Year'].to_numpy(dtype=int)
+        services, service_positions = np.unique(service_names, return_inverse=True)
+        years, year_positions = np.unique(year_numbers, return_inverse=True)
+        values = np.zeros((len(services), len(years), 12))
+        np.add.at(values, (service_positions, year_positions), np.nan_to_num(df[MONTH_NAMES].to_numpy(dtype=float)))
+        present = np.zeros((len(services), len(years)), dtype=bool)
+        present[service_positions, year_positions] = True
+        return cls(services, years, values, present)
+
+    @property
+    def nbytes(self):
+        """Memory held by the values, row flags and service names."""
+        return self.values.nbytes + self.present.nbytes + self.services.memory_usage(deep=True)
+
+    def _positions(self, index, selected):
+        # Positions of the selected labels (None: all), ignoring unknown ones
+        if selected is None:
+            return np.arange(len(index))
+        positions = pd.Index(index).get_indexer(list(selected))
+        return np.unique(positions[positions >= 0])
+
+    def by_service(self, services=None, years=None):
+        """
+        Revenue per month (columns: the month names) of each selected service, summed
+        over the selected years (None: all). Only services with rows in those years
+        are included, as when grouping the matching CSV rows by service.
+        """
+        service_positions = self._positions(self.services, None if services is None else map(str, services))
+        year_positions = self._positions(self.years, None if years is None else map(int, years))
+        present = self.present[np.ix_(service_positions, year_positions)].any(axis=1)
+        totals = self.values[np.ix_(service_positions, year_positions)].sum(axis=1)[present]
+        return pd.DataFrame(totals, index=self.services[service_positions[present]], columns=MONTH_NAMES)
+
+    def by_period(self, start_period, end_period, services=None):
+        """
+        Revenue per service (rows) and month (columns: period ordinals) from start_period
+        to end_period (inclusive), for the selected services (None: all).
+
+        Columns cover the months of every year in the range with rows for any selected
+        service; rows are the services with rows in those years.
+        """
+        service_positions = self._positions(self.services, None if services is None else map(str, services))
+        present = self.present[service_positions]
+        periods = self.years[:, None] * 12 + np.arange(12)  # period_ordinal() of every year x month
+        in_range = (periods >= start_period) & (periods <= end_period)
+        columns = in_range & present.any(axis=0)[:, None]
+        rows = (present & in_range.any(axis=1)).any(axis=1)
+        values = self.values[service_positions[rows]][:, columns]
+        return pd.DataFrame(values, index=self.services[service_positions[rows]], columns=periods[columns])
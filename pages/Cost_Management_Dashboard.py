@@ -1,56 +1,35 @@
 import pandas as pd
-#pip install plotly_express==0.4.0 
-import plotly.express as px
 import streamlit as st
-import matplotlib.pyplot as plt
-import numpy as np
-from datetime import datetime
-import calendar
 
-st.set_page_config(page_title="Financial_Dashboard",page_icon=":bar_chart:",)
-
-excel_file_path = 'KPI123.xlsx'
-excel_file = pd.ExcelFile(excel_file_path)
-sheet_names = excel_file.sheet_names
+from charts import kpi_bar_chart
+from data_loader import load_year_matrix
+from exports import export_buttons
+from kpi_stats import kpi_statistics
+from kpi_store import ordinal_year_month
+from perf import PageTimings
+from reports import combined_expenditure, month_labels
 
-dfs = []
+st.set_page_config(page_title="Financial_Dashboard",page_icon=":bar_chart:",)
 
-for year_sheet in sheet_names:
-    if year_sheet.isdigit():  # Check if the sheet name is a year (numeric)
-        df1 = pd.read_excel(io=excel_file, sheet_name=year_sheet, skiprows=[], usecols="A:M", nrows=100)
-        new_columns = ['KPI'] + [f'{year_sheet}_{col}' for col in df1.columns[1:]]
-        df1 = df1.rename(columns=dict(zip(df1.columns, new_columns)))
-        dfs.append(df1)
+# Time the stages of this run (sidebar panel with ?perf=1)
+timings = PageTimings('cost')
 
-# Merging
-df = dfs[0]  # Start with the first DataFrame
-for df1 in dfs[1:]:
-    df = pd.merge(df, df1, on=['KPI'], how='outer')
+excel_file_path = 'KPI123.xlsx'
 
-# Extract unique years from column names
-years = list(set([col.split('_')[0] for col in df.columns[1:]]))
-years.sort()
+# Year sheets as a KPI x month matrix on an integer period axis; cached until the workbook changes on disk
+kpis = load_year_matrix(excel_file_path)
+timings.lap('load', rows=len(kpis.kpis))
 
 # Load and display an image from a local file path
 image_path = "medkicklogo.png"
-st.image(image_path, caption="", use_column_width=True)
+st.image(image_path, caption="", width="stretch")
 
 # Streamlit app
 st.title(':green[Cost Management Dashboard]  :chart_with_upwards_trend:')
 
-# Extract the earliest and latest dates from the DataFrame
-earliest_date = min(df.columns[1:], key=lambda x: datetime.strptime(x, '%Y_%B'))
-latest_date = max(df.columns[1:], key=lambda x: datetime.strptime(x, '%Y_%B'))
-
-# Extract the year and month from the earliest and latest dates
-start_year, start_month = earliest_date.split('_')
-end_year, end_month = latest_date.split('_')
-
-# Convert the year and month to integers
-start_year = int(start_year)
-start_month = list(calendar.month_name).index(start_month)
-end_year = int(end_year)
-end_month = list(calendar.month_name).index(end_month)
+# Earliest and latest months of the data
+start_year, start_month = ordinal_year_month(kpis.first_period)
+end_year, end_month = ordinal_year_month(kpis.last_period)
 
 # Select years and months in the sidebar with default selection
 start_year = st.sidebar.number_input('Start Year :date:', value=start_year, step=1)
@@ -58,57 +37,44 @@ start_month = st.sidebar.number_input('Start Month :date:', value=start_month, m
 end_year = st.sidebar.number_input('End Year :date:', value=end_year, step=1)
 end_month = st.sidebar.number_input('End Month :date:', value=end_month, min_value=1, max_value=12, step=1)
 
-# Define callback function to get month options based on the selected year and month
-def get_month_year_options(start_year, start_month, end_year, end_month):
-    selected_months = []
-    for year in range(start_year, end_year + 1):
-        if year == start_year:
-            start_m = start_month
-        else:
-            start_m = 1
-        if year == end_year:
-            end_m = end_month
-        else:
-            end_m = 12
-        for month in range(start_m, end_m + 1):
-            selected_months.append(f"{year}_{calendar.month_name[month]}")
-
-    return selected_months
-
 # Select months in the sidebar with default selection based on the selected years
+month_options = month_labels(start_year, start_month, end_year, end_month)
 selected_months = st.sidebar.multiselect(
     'Selected Month(s) :calendar:', 
-    options=get_month_year_options(start_year, start_month, end_year, end_month), 
-    default=get_month_year_options(start_year, start_month, end_year, end_month)
+    options=month_options, 
+    default=month_options
     )
 
 
+# Only the KPIs picked here build their detail sections (metrics, table and chart)
+selected_kpis = st.sidebar.multiselect(
+    'KPI Details :bar_chart:',
+    options=list(kpis.kpis),
+    default=list(kpis.kpis)[:3],
+    )
+
 # Rerun the app if the selected years or months change
 if st.sidebar.button('Apply'):
-    st.experimental_rerun()
+    st.rerun()
+
+timings.lap('widgets')
 
 # Filter the data based on selected years and months
-selected_cols = ['KPI'] + [col for col in df.columns if any(col.startswith(month) for month in selected_months)]
-dff = df[selected_cols]
+# (positions on the period axis; a contiguous range is a plain slice)
+selection = kpis.positions(selected_months)
+dff = kpis.to_frame(selection)
+timings.lap('filter', rows=len(dff))
 
 # Check if the filtered DataFrame is empty (contains only null values)
 if dff.drop('KPI', axis=1).isnull().all().all():
     st.write("No data available for the selected range.")
 else:
-    # Calculate combined metrics across all KPIs
-    combined_total = dff.iloc[:, 1:].sum().sum()
-    # Calculate highest and lowest costs for a month
-    monthly_sums = dff.iloc[:, 1:].sum(axis=0)
-    monthly_sums_nonzero = monthly_sums[monthly_sums > 0]  # Filter out 0 value months
-    combined_average = monthly_sums_nonzero.mean()
-    combined_median = monthly_sums_nonzero.median()
-    combined_highest = monthly_sums.max()
-    combined_lowest = monthly_sums_nonzero.min()  # Use the minimum value after excluding 0 value months
-    # Find the months associated with the highest and lowest costs
-    combined_highest_month = dff.columns[1:][monthly_sums.argmax()]
-    combined_lowest_month = dff.columns[1:][monthly_sums==combined_lowest]  # Find the month for the lowest value after excluding 0 value months
-    # Convert combined_lowest_month from Index to string
-    combined_lowest_month_str = combined_lowest_month.item()  # or combined_lowest_month.tolist()[0]
+    # Calculate combined metrics across all KPIs (average, median and lowest exclude 0 value months)
+    combined = combined_expenditure(dff)
+    combined_total, combined_average, combined_median = combined['total'], combined['average'], combined['median']
+    combined_highest, combined_highest_month = combined['highest'], combined['highest_month']
+    combined_lowest, combined_lowest_month_str = combined['lowest'], combined['lowest_month']
+    timings.lap('aggregate')
 
     # Format the numeric data in the DataFrame as dollar currency
     dollar_format = '${:,.2f}'
@@ -136,49 +102,9 @@ else:
     st.subheader('Data')
     st.dataframe(dfd, height=3, hide_index=True)
 
-    # Reshape data for Plotly Express
-    reshaped_data = pd.melt(dfd, id_vars='KPI', var_name='Month', value_name='Total Expenditure for the Month')
-
-    # Prepare the data for Plotly Express
-    fig1 = px.bar(
-        data_frame=reshaped_data,
-        x='Month',
-        y='Total Expenditure for the Month',
-        color='Month',  # Assign color based on the month
-        color_discrete_sequence=['#d5f7ef','#c7f4ea','#b9f2e5','#abefdf','#9decda','#8fead5','#74e5cb','#68ceb6','#5cb7a2','#51a08e','#458979','#3a7265','#2e5b51','#22443c'],  # Set the desired color sequence
-        labels={'x': 'Month</b>', 'y': 'Total Expenditure for the Month</b>'},  # Set the x-axis and y-axis labels
-        title=f'Bar Chart for Total Expenditure for the Month ',
-    )
-
-    # Add value labels on top of the bars and Round the values to whole numbers
-    fig1.update_traces(texttemplate='<b>%{y:.0f}</b>', textposition='outside')
-
-    # Make the bar chart title big
-    fig1.update_layout(
-        title_font=dict(size=30),
-    )
-
-    # Adjust the size of the chart
-    fig1.update_layout(
-        autosize=False,
-        width=1100,
-        height=500,
-        plot_bgcolor='rgba(0,0,0,0)',
-       paper_bgcolor='rgba(0,0,0,0)',
-    )
-
-    # Set the font color to dark
-    fig1.update_layout(
-        font=dict(color='black')
-    )
-
-    # Update x and y labels to bold
-    fig1.update_layout(
-        xaxis_title_font=dict(family='Arial', size=14, color='black'),
-        yaxis_title_font=dict(family='Arial', size=14, color='black'),
-        xaxis_tickfont=dict(family='Arial', size=12, color='black'),
-        yaxis_tickfont=dict(family='Arial', size=12, color='black'),
-    )
+    # Bar chart of the monthly totals, cached on its data and options
+    fig1 = kpi_bar_chart(dfd, 'Total Expenditure for the Month', 'Bar Chart for Total Expenditure for the Month ',
+                         y_label='Total Expenditure for the Month')
 
     # Display the bar chart
     st.plotly_chart(fig1)
@@ -187,6 +113,9 @@ else:
     st.subheader('Data')
     st.dataframe(dff, hide_index=True)
 
+    # Export the KPI table for the selected months
+    export_buttons(dff, 'cost_kpis', 'cost_kpis_export')
+
     # Calculate the total expenditure for each KPI in the selected range
     total_expenditure_per_kpi = dff.groupby('KPI').sum().sum(axis=1)
 
@@ -200,7 +129,9 @@ else:
     pie_chart_df = pd.DataFrame(pie_chart_data)
 
     if not pie_chart_df.empty:
-        # Create Pie Chart using Plotly Express
+        # Create Pie Chart using Plotly Express (imported here, once there is a chart to draw)
+        import plotly.express as px
+
         fig_pie = px.pie(
             data_frame=pie_chart_df,
             names='KPI',
@@ -234,38 +165,33 @@ else:
         st.write("No data available for the selected range.")
 
 
-    # Iterate through each KPI
-    for kpi_name in df['KPI']:
+    timings.lap('render')
+
+    # Total, average, median, highest and lowest month of every KPI in one pass
+    # (totals and averages of a contiguous month range come from the prefix sums)
+    kpi_stats = kpi_statistics(dff, dff.columns[1:], range_totals=kpis.range_totals(selection))
+    timings.lap('aggregate')
+
+    # Iterate through the KPIs picked in the sidebar
+    for i, kpi_name in enumerate(kpis.kpis):
+        if kpi_name not in selected_kpis:
+            continue
+
         markdown_text = f'<h1 style="color: green;">KPI: {kpi_name}</h1>'
         st.markdown(markdown_text, unsafe_allow_html=True)
         # st.markdown(f'# KPI: {kpi_name}')
 
-        # Filtered DataFrame for the specific KPI
-        filtered_df = df[df['KPI'] == kpi_name]
-
-        # Filter the data based on selected years and months
-        selected_cols = ['KPI'] + [col for col in df.columns if any(col.startswith(month) for month in selected_months)]
-        filtered_data = filtered_df[selected_cols]
+        # Row of the filtered DataFrame for the specific KPI (same row order as kpis.kpis)
+        filtered_data = dff.iloc[[i]]
 
         # Format the numeric data in the DataFrame as dollar currency
         dollar_format = '${:,.2f}'
 
-        # Calculate important metrics
-        total = filtered_data.iloc[:, 1:].sum().sum()
-        average = filtered_data.iloc[:, 1:].mean().mean()
-        median = filtered_data.iloc[:, 1:].median().median()
-        # Calculate highest and lowest costs for a month (excluding 0 values)
-        monthly_sums = filtered_data.iloc[:, 1:].sum(axis=0)
-        monthly_sums_nonzero = monthly_sums[monthly_sums > 0]  # Filter out 0 value months
-        highest_value = monthly_sums.max()
-        lowest_value = monthly_sums_nonzero.min()  # Use the minimum value after excluding 0 value months
-
-        # Find the months associated with the highest and lowest costs
-        highest_month = filtered_data.columns[1:][monthly_sums.argmax()]
-        lowest_month = filtered_data.columns[1:][monthly_sums==lowest_value]  # Find the month for the lowest value after excluding 0 value months
-
-        # Convert lowest_month from Index to string
-        lowest_month_str = lowest_month.item()  # or lowest_month.tolist()[0]
+        # Precomputed metrics for this KPI
+        stats = kpi_stats.iloc[i]
+        total, average, median = stats['total'], stats['average'], stats['median']
+        highest_value, highest_month = stats['highest'], stats['highest_month']
+        lowest_value, lowest_month_str = stats['lowest'], stats['lowest_month']
 
         # Define the format for bold text
         bold_font = "<b>{}</b>"
@@ -280,49 +206,8 @@ else:
         st.subheader('Data')
         st.dataframe(filtered_data, height=3, hide_index=True)
 
-        # Reshape data for Plotly Express
-        reshaped_data = pd.melt(filtered_data, id_vars='KPI', var_name='Month', value_name='Cost')
-
-        # Prepare the data for Plotly Express
-        fig = px.bar(
-            data_frame=reshaped_data,
-            x='Month',
-            y='Cost',
-            color='Month',  # Assign color based on the month
-            color_discrete_sequence=['#d5f7ef','#c7f4ea','#b9f2e5','#abefdf','#9decda','#8fead5','#74e5cb','#68ceb6','#5cb7a2','#51a08e','#458979','#3a7265','#2e5b51','#22443c'],  # Set the desired color sequence
-            labels={'x': 'Month</b>', 'y': 'Cost</b>'},  # Set the x-axis and y-axis labels
-            title=f'Bar Chart for {kpi_name}',
-        )
-
-        # Add value labels on top of the bars and Round the values to whole numbers
-        fig.update_traces(texttemplate='<b>%{y:.0f}</b>', textposition='outside')
-
-        # Make the bar chart title big
-        fig.update_layout(
-            title_font=dict(size=30),
-        )
-
-        # Adjust the size of the chart
-        fig.update_layout(
-            autosize=False,
-            width=1100,
-            height=500,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-        )
-
-        # Set the font color to dark
-        fig.update_layout(
-            font=dict(color='black')
-        )
-
-        # Update x and y labels to bold
-        fig.update_layout(
-            xaxis_title_font=dict(family='Arial', size=14, color='black'),
-            yaxis_title_font=dict(family='Arial', size=14, color='black'),
-            xaxis_tickfont=dict(family='Arial', size=12, color='black'),
-            yaxis_tickfont=dict(family='Arial', size=12, color='black'),
-        )
+        # Bar chart of the KPI, cached on its data and options
+        fig = kpi_bar_chart(filtered_data, 'Cost', f'Bar Chart for {kpi_name}')
 
         # Display the bar chart
         st.plotly_chart(fig)
@@ -330,4 +215,5 @@ else:
         # Add space between KPIs
         st.markdown('<hr style="margin-top: 50px; margin-bottom: 50px; border-width: 0; border-top: 2px solid #74e5cb">', unsafe_allow_html=True)
 
-
+timings.lap('render')
+timings.finish()
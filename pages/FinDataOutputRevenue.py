@@ -1,10 +1,7 @@
-from pathlib import Path  # Python Standard Library
-import pandas as pd  # pip install pandas openpyxl
-from pathlib import Path  # Python Standard Library
-import plotly.express as px
 import streamlit as st
-import matplotlib.pyplot as plt
-import plotly.figure_factory as ff
+from data_loader import load_revenue_cube, load_table
+from exports import export_buttons
+from perf import PageTimings
 #import openpyxl
 #from openpyxl import Workbook,load_workbook
 
@@ -16,17 +13,20 @@ st.set_page_config(page_title = "Med-Kick Finance Dashboard",
                    layout ="wide"
                   )
 
-@st.cache_data()
+# Time the stages of this run (sidebar panel with ?perf=1)
+timings = PageTimings('streams')
+
 def rev_dash():
+    # Shared by all sessions until the CSV changes on disk: the rows (for the filter
+    # options and the export) and the service x year x month cube the figures come from
     data = 'FinDataOutputRevenue.csv'
-    df = pd.read_csv(data)
-    df.head(5)
-    return df 
+    return load_table(data), load_revenue_cube(data)
    
 
-df = rev_dash()
+df, cube = rev_dash()
 
-df.rename(columns={'Revenue Stream by Service': 'Service'}, inplace=True)
+df = df.rename(columns={'Revenue Stream by Service': 'Service'})  # The loaded frame is shared; rename a copy
+timings.lap('load', rows=len(df))
 
 # sidebars#
 st.sidebar.header("Period of Operation" )
@@ -41,10 +41,11 @@ Service = st.sidebar.multiselect('Service',
                                 default=df['Service'].unique()
                                 )
 
+timings.lap('widgets')
 
-df_filter= df.query(
-    "Year ==@Year & Service ==@Service"
-    )
+# Rows of the selected years and services, for the export
+df_filter = df[df['Year'].isin(Year).to_numpy() & df['Service'].isin(Service).to_numpy()]
+timings.lap('filter', rows=len(df_filter))
 
 st.markdown('##')
 st.sidebar.title("Helpful Definitions")
@@ -69,17 +70,19 @@ st.markdown('##')
 
 
 #--KPI'S--#
-no_of_services = df_filter['Service'].nunique()
-total_rev = df_filter[['January','February','March','April','May','June','July','August','September','October','November','December']].sum()
+# Revenue per service and month over the selected years; every KPI and chart is derived from it
+rev_by_month = cube.by_service(Service, Year).rename_axis('Service')
+no_of_services = len(rev_by_month)
+total_rev = rev_by_month.sum()
 ttotal_rev= total_rev.sum()
 round_total_rev= round(ttotal_rev,2)
-rev_by_month = df_filter.groupby(by=['Service']).sum()[['January','February','March','April','May','June','July','August','September','October','November','December']]
 trans_rev_by_month = rev_by_month.transpose()
-trans_rev_by_month_sum = trans_rev_by_month.sum()
+trans_rev_by_month_sum = rev_by_month.sum(axis=1)
 min_serv = min(trans_rev_by_month_sum)
 rounded_min_serv= round(min_serv,2)
 max_serv = max(trans_rev_by_month_sum)
 rounded_max_serv= round(max_serv,2)
+timings.lap('aggregate')
 
 left_column,middle_column,right_column = st.columns(3)
 with left_column:
@@ -100,18 +103,18 @@ with left_column:
 
 st.markdown('---')
 
-rev_by_serv = (
-    df_filter[['January','February','March','April','May','June','July','August','September','October','November','December']].sum()
-    )
-
+# Export the rows for the selected years and services
+export_buttons(df_filter, 'revenue_streams', 'revenue_streams_export')
 
-rev_by_serv_month = (
-    df_filter.groupby(by=['Service']).sum()[['January','February','March','April','May','June','July','August','September','October','November','December']]
-   )
+timings.lap('render')
 
-rev_by_serv_month_transpose = rev_by_serv_month.transpose()
+# The chart data are the aggregates above: revenue by month, by service and month, and by service
+rev_by_serv = total_rev
+rev_by_serv_month_transpose = trans_rev_by_month
+rev_by_serv_month_transpose_sum = trans_rev_by_month_sum
 
-rev_by_serv_month_transpose_sum = rev_by_serv_month_transpose.sum()
+# Plotly Express is imported when the charts are built, after the KPIs are on screen
+import plotly.express as px
 
 img_one_revenue= px.bar(
     rev_by_serv,
@@ -138,9 +141,11 @@ img_two_revenue= px.line(
  
 
 
+timings.lap('figures')
+
 left_column,right_column = st.columns(2)
-left_column.plotly_chart(img_two_revenue, use_container_width=True)
-right_column.plotly_chart(img_three_revenue, use_container_width=True)
+left_column.plotly_chart(img_two_revenue, width="stretch")
+right_column.plotly_chart(img_three_revenue, width="stretch")
 
 st.markdown("##")
 st.plotly_chart(img_one_revenue)
@@ -158,3 +163,6 @@ st.markdown(hide_st_style, unsafe_allow_html=True)
 #st.plotly_chart(img_one_revenue)
 #st.plotly_chart(img_two_revenue)
 #st.plotly_chart(img_three_revenue)
+
+timings.lap('render')
+timings.finish()
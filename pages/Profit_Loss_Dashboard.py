@@ -1,48 +1,37 @@
-import pandas as pd
-#pip install plotly_express==0.4.0 
-import plotly.express as px
 import streamlit as st
-import matplotlib.pyplot as plt
-import numpy as np
-from datetime import datetime
-import calendar
+
+from charts import kpi_bar_chart
+from data_loader import load_sheet, load_sheet_matrix
+from kpi_store import MONTH_YEAR, ordinal_year_month
+from kpi_stats import kpi_statistics
+from perf import PageTimings
+from reports import month_labels
 
 st.set_page_config(page_title="Profit and Loss",page_icon=":bar_chart:",)
 
+# Time the stages of this run (sidebar panel with ?perf=1)
+timings = PageTimings('pl')
+
 excel_file_path = 'Med-Kick_Investment.xlsx'
-excel_file = pd.ExcelFile(excel_file_path)
 
-#usecols="A:S",
-#Sheet 1
-df=pd.read_excel(io=excel_file,engine="openpyxl",sheet_name="Sheet1",skiprows=[],usecols="A:S",nrows=100)
+# Sheets are cached until the workbook changes on disk
+#Sheet 1: KPI x month matrix on an integer period axis
+kpis = load_sheet_matrix(excel_file_path, "Sheet1", usecols="A:S")
 
 #Sheet 2
-df1=pd.read_excel(io=excel_file,engine="openpyxl",sheet_name="Profit and Loss",skiprows=[],usecols="A:S",nrows=100)
-
-# Extract unique years from column names
-years = list(set([col.split('_')[0] for col in df.columns[1:]]))
-years.sort()
+df1 = load_sheet(excel_file_path, "Profit and Loss", usecols="A:S")
+timings.lap('load', rows=len(kpis.kpis))
 
 # Load and display an image from a local file path
 image_path = "medkicklogo.png"
-st.image(image_path, caption="", use_column_width=True)
+st.image(image_path, caption="", width="stretch")
 
 # Streamlit app
 st.title(':green[Profit and Loss]  :chart_with_upwards_trend:')
 
-# Extract the earliest and latest dates from the DataFrame
-earliest_date = min(df.columns[1:], key=lambda x: datetime.strptime(x, '%B_%Y'))
-latest_date = max(df.columns[1:], key=lambda x: datetime.strptime(x, '%B_%Y'))
-
-# Extract the month and year from the earliest and latest dates
-start_month, start_year = earliest_date.split('_')
-end_month, end_year = latest_date.split('_')
-
-# Convert the year and month to integers
-start_year = int(start_year)
-start_month = list(calendar.month_name).index(start_month)
-end_year = int(end_year)
-end_month = list(calendar.month_name).index(end_month)
+# Earliest and latest months of the data
+start_year, start_month = ordinal_year_month(kpis.first_period)
+end_year, end_month = ordinal_year_month(kpis.last_period)
 
 # Sidebar for selecting date range
 start_month = st.sidebar.number_input('Start Month :date:', value=start_month, min_value=1, max_value=12)
@@ -50,37 +39,32 @@ start_year = st.sidebar.number_input('Start Year :date:', value=start_year)
 end_month = st.sidebar.number_input('End Month :date:', value=end_month, min_value=1, max_value=12)
 end_year = st.sidebar.number_input('End Year :date:', value=end_year)
 
-# Define callback function to get date options based on the selected range
-def get_month_year_options(start_month, start_year, end_month, end_year):
-    selected_dates = []
-    for year in range(start_year, end_year + 1):
-        if year == start_year:
-            start_m = start_month
-        else:
-            start_m = 1
-        if year == end_year:
-            end_m = end_month
-        else:
-            end_m = 12
-        for month in range(start_m, end_m + 1):
-            selected_dates.append(f"{calendar.month_name[month]}_{year}")
-
-    return selected_dates
-
 # Select dates in the sidebar with default selection based on the selected range
+date_options = month_labels(start_year, start_month, end_year, end_month, MONTH_YEAR)
 selected_dates = st.sidebar.multiselect(
     'Selected Dates :calendar:',
-    options=get_month_year_options(start_month, start_year, end_month, end_year),
-    default=get_month_year_options(start_month, start_year, end_month, end_year)
+    options=date_options,
+    default=date_options
 )
 
+# Only the KPIs picked here build their detail sections (metrics, table and chart)
+selected_kpis = st.sidebar.multiselect(
+    'KPI Details :bar_chart:',
+    options=list(kpis.kpis),
+    default=list(kpis.kpis)[:3],
+    )
+
 # Rerun the app if the selected dates change
 if st.sidebar.button('Apply'):
-    st.experimental_rerun()
+    st.rerun()
+
+timings.lap('widgets')
 
 # Filter the data based on selected dates
-selected_cols = ['KPI'] + [col for col in df.columns if any(col.startswith(date) for date in selected_dates)]
-dff = df[selected_cols]
+# (positions on the period axis; a contiguous range is a plain slice)
+selection = kpis.positions(selected_dates)
+dff = kpis.to_frame(selection)
+timings.lap('filter', rows=len(dff))
 
 # Check if the filtered DataFrame is empty (contains only null values)
 if dff.drop('KPI', axis=1).isnull().all().all():
@@ -90,38 +74,33 @@ else:
     st.subheader('Data')
     st.dataframe(dff, hide_index=True)
 
-    # Iterate through each KPI
-    for kpi_name in df['KPI']:
+    timings.lap('render')
+
+    # Total, average, median, highest and lowest month of every KPI in one pass
+    # (totals and averages of a contiguous month range come from the prefix sums)
+    kpi_stats = kpi_statistics(dff, dff.columns[1:], range_totals=kpis.range_totals(selection), lowest_excludes='zero')
+    timings.lap('aggregate')
+
+    # Iterate through the KPIs picked in the sidebar
+    for i, kpi_name in enumerate(kpis.kpis):
+        if kpi_name not in selected_kpis:
+            continue
+
         markdown_text = f'<h1 style="color: green;">{kpi_name}</h1>'
         st.markdown(markdown_text, unsafe_allow_html=True)
         # st.markdown(f'# KPI: {kpi_name}')
 
-        # Filtered DataFrame for the specific KPI
-        filtered_df = df[df['KPI'] == kpi_name]
-
-        # Filter the data based on selected years and months
-        selected_cols = ['KPI'] + [col for col in df.columns if any(col.startswith(month) for month in selected_dates)]
-        filtered_data = filtered_df[selected_cols]
+        # Row of the filtered DataFrame for the specific KPI (same row order as kpis.kpis)
+        filtered_data = dff.iloc[[i]]
 
         # Format the numeric data in the DataFrame as dollar currency
         dollar_format = '${:,.2f}'
 
-        # Calculate important metrics
-        total = filtered_data.iloc[:, 1:].sum().sum()
-        average = filtered_data.iloc[:, 1:].mean().mean()
-        median = filtered_data.iloc[:, 1:].median().median()
-        # Calculate highest and lowest costs for a month (excluding 0 values)
-        monthly_sums = filtered_data.iloc[:, 1:].sum(axis=0)
-        monthly_sums_nonzero = monthly_sums[monthly_sums != 0]  # Filter out 0 value months
-        highest_value = monthly_sums.max()
-        lowest_value = monthly_sums_nonzero.min()  # Use the minimum value after excluding 0 value months
-
-        # Find the months associated with the highest and lowest costs
-        highest_month = filtered_data.columns[1:][monthly_sums.argmax()]
-        lowest_month = filtered_data.columns[1:][monthly_sums==lowest_value]  # Find the month for the lowest value after excluding 0 value months
-
-        # Convert lowest_month from Index to string
-        lowest_month_str = lowest_month.item()  # or lowest_month.tolist()[0]
+        # Precomputed metrics for this KPI
+        stats = kpi_stats.iloc[i]
+        total, average, median = stats['total'], stats['average'], stats['median']
+        highest_value, highest_month = stats['highest'], stats['highest_month']
+        lowest_value, lowest_month_str = stats['lowest'], stats['lowest_month']
 
         # Define the format for bold text
         bold_font = "<b>{}</b>"
@@ -146,53 +125,15 @@ else:
         st.subheader('Data')
         st.dataframe(filtered_data, height=3, hide_index=True)
 
-        # Reshape data for Plotly Express
-        reshaped_data = pd.melt(filtered_data, id_vars='KPI', var_name='Month', value_name='Value')
-
-        # Prepare the data for Plotly Express
-        fig = px.bar(
-            data_frame=reshaped_data,
-            x='Month',
-            y='Value',
-            color='Month',  # Assign color based on the month
-            color_discrete_sequence=['#d5f7ef','#c7f4ea','#b9f2e5','#abefdf','#9decda','#8fead5','#74e5cb','#68ceb6','#5cb7a2','#51a08e','#458979','#3a7265','#2e5b51','#22443c'],  # Set the desired color sequence
-            labels={'x': 'Month</b>', 'y': 'Cost</b>'},  # Set the x-axis and y-axis labels
-            title=f'Bar Chart for {kpi_name}',
-        )
-
         if kpi_name in ['Gross Margin', 'Net Margin']:
-            # Add value labels on top of the bars as percentage strings
-            fig.update_traces(texttemplate='%{y:.2%}', textposition='outside')
+            # Value labels on top of the bars as percentage strings
+            texttemplate = '%{y:.2%}'
         else:
-            # Add value labels on top of the bars and Round the values to whole numbers
-            fig.update_traces(texttemplate='<b>$%{y:.0f}</b>', textposition='outside')
-
-        # Make the bar chart title big
-        fig.update_layout(
-            title_font=dict(size=30),
-        )
-
-        # Adjust the size of the chart
-        fig.update_layout(
-            autosize=False,
-            width=1100,
-            height=500,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-        )
-
-        # Set the font color to dark
-        fig.update_layout(
-            font=dict(color='black')
-        )
-
-        # Update x and y labels to bold
-        fig.update_layout(
-            xaxis_title_font=dict(family='Arial', size=14, color='black'),
-            yaxis_title_font=dict(family='Arial', size=14, color='black'),
-            xaxis_tickfont=dict(family='Arial', size=12, color='black'),
-            yaxis_tickfont=dict(family='Arial', size=12, color='black'),
-        )
+            # Value labels on top of the bars rounded to whole dollars
+            texttemplate = '<b>$%{y:.0f}</b>'
+
+        # Bar chart of the KPI, cached on its data and options
+        fig = kpi_bar_chart(filtered_data, 'Value', f'Bar Chart for {kpi_name}', texttemplate=texttemplate)
 
         # Display the bar chart
         st.plotly_chart(fig)
@@ -200,4 +141,5 @@ else:
         # Add space between KPIs
         st.markdown('<hr style="margin-top: 50px; margin-bottom: 50px; border-width: 0; border-top: 2px solid #74e5cb">', unsafe_allow_html=True)
 
-
+timings.lap('render')
+timings.finish()
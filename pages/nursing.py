@@ -1,17 +1,25 @@
+import os
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import altair as alt
-import plotly.express as px
 from datetime import datetime
-import os
+
+from call_logs import (CallLogStore, call_metrics, filter_calls, rollup_answers, rollup_call_metrics, slice_by_start_time,
+                       with_local_times, with_unanswered_marked)
+from charts import binned_counts, downsample_time_series, histogram_chart
+from datasets import shared_dataset
+from exports import export_buttons
+from perf import PageTimings
+from tables import paginated_table
 
 st.set_page_config(page_title="Nurse Call Dashboard II",page_icon=":bar_chart:",)
 
+# Time the stages of this run (sidebar panel with ?perf=1)
+timings = PageTimings('calls')
+
 # Load and display an image from a local file path
 image_path = "medkicklogo.png"
-st.image(image_path, caption="", use_column_width=True)
+st.image(image_path, caption="", width="stretch")
 
 # Custom color palette using different shades of #74E5CB
 custom_color = "#74E5CB"
@@ -34,22 +42,21 @@ st.markdown(
 # Specify the folder where your Excel files are located
 folder_path = 'Sasi'
 
-# Initialize an empty list to store DataFrames
-dfs = []
-
-# Loop through all files in the current directory
-for filename in os.listdir(folder_path):
-    if filename.endswith(('.xlsx', '.xls', '.csv')):
-        file_path = os.path.join(folder_path, filename)
-        if filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(file_path)
-        elif filename.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        dfs.append(df)
+@st.cache_resource(show_spinner=False)
+def get_call_log_store(folder_path):
+    # One store per server process; it remembers which exports were already ingested
+    return CallLogStore(folder_path)
 
-# Concatenate or merge the DataFrames into one
 
-data = pd.concat(dfs, ignore_index=True)
+# Parse only exports that are new or changed since the last refresh
+store = get_call_log_store(folder_path)
+store.refresh()
+# Shared like the other datasets, so it counts towards the memory budget; if the registry
+# drops it, the store lets go of its rows too and reloads them on the next refresh
+call_log_version, data, call_rollup = store.snapshot()
+data, call_rollup = shared_dataset(('call_log', os.path.abspath(folder_path)), call_log_version,
+                                   lambda: (data, call_rollup), on_evict=store.release)
+timings.lap('load', rows=len(data))
 
 # Set the title and header with custom text color and background
 st.title("Call Data Dashboard")
@@ -66,23 +73,23 @@ select_all_callee = st.sidebar.checkbox("Select All Callees")
 # Create a "Select All" option for the direction filter
 select_all_direction = st.sidebar.checkbox("Select All Directions")
 
-# Populate the caller filter based on DataFrame unique values
+# Populate the caller filter from the stored categories (None means no filtering)
 if select_all_caller:
-    selected_caller = data['From'].unique()
+    selected_caller = None
 else:
-    selected_caller = st.sidebar.multiselect("Select Caller:", data['From'].unique())
+    selected_caller = st.sidebar.multiselect("Select Caller:", data['From'].cat.categories)
 
-# Populate the callee filter based on DataFrame unique values
+# Populate the callee filter from the stored categories
 if select_all_callee:
-    selected_callee = data['To'].unique()
+    selected_callee = None
 else:
-    selected_callee = st.sidebar.multiselect("Select Callee:", data['To'].unique())
+    selected_callee = st.sidebar.multiselect("Select Callee:", data['To'].cat.categories)
 
-# Populate the direction filter based on DataFrame unique values
+# Populate the direction filter from the stored categories
 if select_all_direction:
-    selected_direction = data['Direction'].unique()
+    selected_direction = None
 else:
-    selected_direction = st.sidebar.multiselect("Select Direction:", data['Direction'].unique())
+    selected_direction = st.sidebar.multiselect("Select Direction:", data['Direction'].cat.categories)
 
 # Add a date filter to the sidebar
 start_date = st.sidebar.date_input("Start Date", datetime(2023, 1, 1))
@@ -94,33 +101,40 @@ st.sidebar.markdown(
     unsafe_allow_html=True
 )
 
-# Convert user input dates to the desired format
-start_date_str = start_date.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-end_date_str = end_date.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-
-# Filter data based on user selections
-filtered_data = data[(data['From'].isin(selected_caller)) &
-                     (data['To'].isin(selected_callee)) &
-                     (data['Direction'].isin(selected_direction)) &
-                     (data['Start Time'] >= start_date_str) &
-                     (data['End Time'] <= end_date_str)]
-
-# Filter out data with negative duration (erroneous)
-filtered_data = filtered_data[filtered_data['Duration'] >= 0]
-
-# Recalculate duration using Start Time and End Time
-filtered_data['Start Time'] = pd.to_datetime(filtered_data['Start Time'], format='%Y-%m-%dT%H:%M:%S.%fZ', errors='coerce')
-filtered_data['End Time'] = pd.to_datetime(filtered_data['End Time'], format='%Y-%m-%dT%H:%M:%S.%fZ', errors='coerce')
-filtered_data['Duration'] = (filtered_data['End Time'] - filtered_data['Start Time']).dt.total_seconds()
-
-# Calculate call volume and durations
-total_call_volume = len(filtered_data)
-inbound_volume = (filtered_data['Direction'] == 'INBOUND').sum()
-outbound_volume = (filtered_data['Direction'] == 'OUTBOUND').sum()
-total_duration = filtered_data['Duration'].sum()
-inbound_duration = filtered_data.loc[filtered_data['Direction'] == 'INBOUND', 'Duration'].sum()
-outbound_duration = filtered_data.loc[filtered_data['Direction'] == 'OUTBOUND', 'Duration'].sum()
+timings.lap('widgets')
+
+# Filter data based on user selections; calls are sorted by start time, so the date
+# range is a binary-search slice, and a call must also have ended by the end date
+start_ts = pd.Timestamp(start_date)
+end_ts = pd.Timestamp(end_date)
+filtered_data = filter_calls(data, start_ts, end_ts, selected_caller, selected_callee, selected_direction)
+timings.lap('filter', rows=len(filtered_data))
+
+# Calls with a negative (erroneous) duration were dropped and Duration recomputed
+# from Start/End Time when the exports were ingested
+
+# Identifies the filtered rows for cached charts
+filter_key = (
+    call_log_version, start_ts, end_ts,
+    None if selected_caller is None else tuple(selected_caller),
+    None if selected_callee is None else tuple(selected_callee),
+    None if selected_direction is None else tuple(selected_direction),
+)
+
+# Calculate call volume and durations from the per-nurse daily rollup when it can express
+# the filters (callers of outbound or callees of inbound calls), else from the calls
+if rollup_answers(selected_caller, selected_callee, selected_direction):
+    metrics = rollup_call_metrics(call_rollup, start_ts, end_ts, selected_caller, selected_callee, selected_direction)
+else:
+    metrics = call_metrics(filtered_data)
+total_call_volume = metrics['calls']
+inbound_volume = metrics['inbound_calls']
+outbound_volume = metrics['outbound_calls']
+total_duration = metrics['duration']
+inbound_duration = metrics['inbound_duration']
+outbound_duration = metrics['outbound_duration']
 average_duration = total_duration / total_call_volume if total_call_volume > 0 else 0
+timings.lap('aggregate')
 
 # Display call volume and duration metrics at the top of the dashboard
 st.write("## Call Metrics")
@@ -137,14 +151,24 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Display filtered data with a lighter background and custom styling
+# Display filtered data with a lighter background and custom styling; sorted and paged
+# on the server, so only the visible page is styled and sent to the browser
 st.subheader("Filtered Data")
-st.dataframe(filtered_data.style.set_properties(**{'background-color': lighter_color, 'color': 'black'}))
-
-# Check for and handle null values with custom styling
-if filtered_data.isnull().sum().any():
+# The local-time columns are rebuilt for the visible page / exported chunk only; the table
+# shows unanswered calls as '--:--:--' like the exports
+paginated_table(filtered_data, 'filtered_calls', default_sort='Start Time', presorted_by='Start Time',
+                style_properties={'background-color': lighter_color, 'color': 'black'},
+                derive=lambda rows: with_unanswered_marked(with_local_times(rows)))
+
+# Export every filtered call (not just the visible page), written to disk and linked only when a button is clicked
+export_buttons(filtered_data, 'filtered_calls', 'filtered_calls_export', derive=with_local_times)
+
+# Check for and handle null values with custom styling (a missing Answer Time means
+# the call was not answered, not that data is missing)
+null_counts = filtered_data.drop(columns='Answer Time').isnull().sum()
+if null_counts.any():
     st.subheader("Null Values in Filtered Data")
-    st.dataframe(filtered_data.isnull().sum().to_frame(name='Null Count').style.set_properties(
+    st.dataframe(null_counts.to_frame(name='Null Count').style.set_properties(
         **{'background-color': lighter_color, 'color': 'black'}))
 
 # Create charts
@@ -158,12 +182,12 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Create a Matplotlib figure and axis with custom colors
-fig, ax = plt.subplots()
-sns.histplot(filtered_data['Duration'], bins=20, kde=True, color=custom_color, edgecolor='k')
-ax.set_xlabel("Duration (seconds)")  # Label for the x-axis
-ax.set_ylabel("Frequency")           # Label for the y-axis
-st.pyplot(fig)  # Display the Matplotlib figure in Streamlit
+# Binned histogram with a KDE line, cached per data version and filter selection
+timings.lap('render')
+fig_hist = histogram_chart(filtered_data['Duration'].to_numpy(), filter_key, bins=20, color=custom_color)
+timings.lap('figures')
+st.plotly_chart(fig_hist, width="stretch")
+timings.lap('render')
 
 # Explanation for the Disposition Counts
 st.write("#### Disposition Counts")
@@ -175,7 +199,9 @@ st.markdown(
 )
 
 disposition_counts = filtered_data['Disposition'].value_counts()
-st.bar_chart(disposition_counts, use_container_width=True)  # Use container width for better layout
+timings.lap('aggregate')
+st.bar_chart(disposition_counts, width="stretch")  # Use container width for better layout
+timings.lap('render')
 
 # Explanation for the Time Series Analysis
 st.write("### Time Series Analysis")
@@ -186,14 +212,31 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Create a time series line chart with Altair and add labels
-line_chart = alt.Chart(filtered_data.reset_index()).mark_line().encode(
+# Point budget for the chart (set in the sidebar) and a zoom window: only the calls
+# inside the window are downsampled (LTTB), so zooming in shows more detail
+max_points = st.sidebar.number_input('Time Series Points :chart_with_upwards_trend:', min_value=100, max_value=20000, value=2000, step=100)
+series_data = filtered_data
+zoom = None
+if len(filtered_data) and filtered_data['Start Time'].iloc[0] < filtered_data['Start Time'].iloc[-1]:
+    first_call = filtered_data['Start Time'].iloc[0].to_pydatetime()
+    last_call = filtered_data['Start Time'].iloc[-1].to_pydatetime()
+    zoom = st.slider('Time Window', min_value=first_call, max_value=last_call, value=(first_call, last_call), format='YYYY-MM-DD HH:mm')
+    series_data = slice_by_start_time(filtered_data, *zoom)
+series = downsample_time_series(series_data, (filter_key, zoom), 'Start Time', 'Duration', max_points=max_points)
+
+# Create a time series line chart with Altair and add labels (Altair is imported here,
+# so the metrics and table above are sent before it loads)
+import altair as alt
+
+line_chart = alt.Chart(series).mark_line().encode(
     x='Start Time:T',  # Time-based x-axis
     y=alt.Y('Duration:Q', title='Call Duration (seconds)'),  # Label for y-axis
     tooltip=['Start Time:T', alt.Tooltip('Duration:Q', title='Call Duration (seconds)')]
 ).properties(width=700, height=400)  # Adjust chart dimensions
 
-st.altair_chart(line_chart, use_container_width=True)  # Use container width for better layout
+timings.lap('figures')
+st.altair_chart(line_chart, width="stretch")  # Use container width for better layout
+timings.lap('render')
 
 # Explanation for the Distribution of Call Directions
 st.write("#### Distribution of Call Directions")
@@ -211,13 +254,17 @@ inbound_percentage = (direction_counts.get("INBOUND", 0) / total_calls) * 100
 outbound_percentage = (direction_counts.get("OUTBOUND", 0) / total_calls) * 100
 
 # Create a custom Pie chart
+import plotly.express as px
+
 fig_pie = px.pie(
     names=["INBOUND", "OUTBOUND"],
     values=[inbound_percentage, outbound_percentage],
     title='Call Directions'
 )
 fig_pie.update_traces(marker=dict(colors=[custom_color, darker_color]))
+timings.lap('figures')
 st.plotly_chart(fig_pie)
+timings.lap('render')
 
 # Explanation for the Scatter Plot
 st.write("#### Scatter Plot: Call Duration vs. Disposition")
@@ -228,11 +275,20 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-scatter_chart = alt.Chart(filtered_data).mark_circle(size=60).encode(
-    x='Duration:Q',
+# Calls counted per disposition and duration bin on the server; one circle per
+# non-empty bin, sized by its number of calls
+disposition_bins = binned_counts(filtered_data, filter_key, 'Disposition', 'Duration', bins=40)
+
+scatter_chart = alt.Chart(disposition_bins).mark_circle().encode(
+    x=alt.X('Duration:Q', title='Duration (seconds)'),
     y='Disposition:N',
+    size=alt.Size('Calls:Q', title='Calls'),
     color=alt.Color('Disposition:N', scale=alt.Scale(domain=list(disposition_counts.index), range=[custom_color, darker_color])),
-    tooltip=['Duration:Q', 'Disposition:N']
+    tooltip=['Disposition:N', alt.Tooltip('Bin Start:Q', title='Duration from'), alt.Tooltip('Bin End:Q', title='Duration to'), 'Calls:Q']
 ).properties(width=700, height=300)
 
-st.altair_chart(scatter_chart, use_container_width=True)
+timings.lap('figures')
+st.altair_chart(scatter_chart, width="stretch")
+
+timings.lap('render')
+timings.finish()
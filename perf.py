@@ -0,0 +1,103 @@
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from datasets import dataset_registry
+
+# Stage timings are logged as one JSON object per line; set MEDKICK_PERF_LOG to a
+# file path to write them there (otherwise they go to stderr)
+PERF_LOG = os.environ.get('MEDKICK_PERF_LOG')
+
+# Show the sidebar panel on every page (otherwise only with ?perf=1 in the URL)
+PERF_PANEL = os.environ.get('MEDKICK_PERF_PANEL', '') not in ('', '0')
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    # Without a handler of their own the INFO timings would be dropped (the root logger is at WARNING)
+    _handler = logging.FileHandler(PERF_LOG) if PERF_LOG else logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False  # Not logged twice when the app also configures the root logger
+
+
+class PageTimings:
+    """
+    Wall-clock time of the stages of one run of a page script.
+
+    The clock starts on creation; lap(stage) charges the time since the previous
+    lap to stage (laps with the same name add up), so a page marks the end of
+    its load, filter, aggregate and render sections without restructuring them.
+    finish() logs every stage with the rerun ID, session ID, page and row counts
+    and shows the sidebar panel (with the memory of the shared datasets) when enabled.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.rerun_id = uuid.uuid4().hex[:12]
+        ctx = get_script_run_ctx(suppress_warning=True)
+        self.session_id = ctx.session_id if ctx is not None else None
+        self.stages = {}  # stage -> [seconds, rows]
+        self.started = self._last = time.perf_counter()
+
+    def lap(self, stage, rows=None):
+        now = time.perf_counter()
+        seconds, previous_rows = self.stages.get(stage, (0.0, None))
+        self.stages[stage] = [seconds + now - self._last, rows if rows is not None else previous_rows]
+        self._last = now
+
+    def finish(self):
+        total = time.perf_counter() - self.started
+        for stage, (seconds, rows) in self.stages.items():
+            self._log(stage, seconds, rows)
+        self._log('total', total, None)
+        if PERF_PANEL or st.query_params.get('perf') == '1':
+            self._panel(total)
+
+    def _log(self, stage, seconds, rows):
+        logger.info(json.dumps({
+            'rerun_id': self.rerun_id,
+            'session_id': self.session_id,
+            'page': self.page,
+            'stage': stage,
+            'ms': round(seconds * 1000, 3),
+            'rows': rows,
+        }))
+
+    def _panel(self, total):
+        with st.sidebar.expander('Performance :stopwatch:', expanded=True):
+            st.dataframe(
+                [{'Stage': stage, 'ms': round(seconds * 1000, 1), 'Rows': rows} for stage, (seconds, rows) in self.stages.items()],
+                hide_index=True,
+            )
+            st.caption(f'Total {total * 1000:.0f} ms · rerun {self.rerun_id}')
+            usage = dataset_registry().memory_usage()
+            st.caption(f"Shared datasets {usage['Bytes'].sum() / 2**20:.2f} MB")
+            st.dataframe(usage, hide_index=True)
+
+
+def stage_percentiles(lines, percentiles=(50, 99)):
+    """p50/p99 (by default) milliseconds per page and stage from the JSON lines of a timing log."""
+    records = pd.DataFrame([json.loads(line) for line in lines if line.strip().startswith('{')])
+    if records.empty:
+        return records
+    grouped = records.groupby(['page', 'stage'])['ms']
+    summary = pd.DataFrame({f'p{p}': grouped.quantile(p / 100) for p in percentiles})
+    summary.insert(0, 'reruns', grouped.size())
+    return summary.reset_index()
+
+
+if __name__ == '__main__':
+    # python perf.py perf.log [more logs]: percentiles per page and stage across all reruns
+    lines = []
+    for path in sys.argv[1:]:
+        with open(path) as file:
+            lines.extend(file)
+    print(stage_percentiles(lines).to_string(index=False))
@@ -0,0 +1,102 @@
+import calendar
+
+import numpy as np
+import pandas as pd
+
+from call_logs import rollup_call_metrics, rollup_rows
+from kpi_stats import kpi_statistics
+from kpi_store import YEAR_MONTH, ordinal_year_month, period_ordinal
+
+# KPI rows shown by the revenue forecast page
+REVENUE_KPIS = ['Total Revenue', 'Revenue Growth Rate', 'Revenue forecast']
+
+
+def month_labels(start_year, start_month, end_year, end_month, label_format=YEAR_MONTH):
+    """Month column labels from start_year/start_month to end_year/end_month (inclusive)."""
+    first, last = period_ordinal(start_year, start_month), period_ordinal(end_year, end_month)
+    return [period_label(ordinal, label_format) for ordinal in range(first, last + 1)]
+
+
+def period_label(ordinal, label_format=YEAR_MONTH):
+    """Column label of a period ordinal, e.g. '2022_March'."""
+    year, month = ordinal_year_month(ordinal)
+    return label_format.format(year=year, month=calendar.month_name[month])
+
+
+def kpi_report(kpis, labels, selected_kpis=None, lowest_excludes='nonpositive'):
+    """
+    (table, stats) of a KpiMatrix for the given month labels.
+
+    table is the 'KPI' plus one column per month frame and stats the matching
+    kpi_statistics() rows, both restricted to selected_kpis when given.
+    """
+    selection = kpis.positions(labels)
+    table = kpis.to_frame(selection)
+    stats = kpi_statistics(table, table.columns[1:], lowest_excludes, kpis.range_totals(selection))
+    if selected_kpis is not None:
+        keep = table['KPI'].isin(selected_kpis).to_numpy()
+        table, stats = table[keep].reset_index(drop=True), stats[keep].reset_index(drop=True)
+    return table, stats
+
+
+def combined_expenditure(table):
+    """
+    Total, average, median, highest and lowest month of the sum of all KPIs of a KPI x month table.
+
+    Average, median and lowest only count months whose sum is positive.
+    """
+    monthly = table.iloc[:, 1:].sum(axis=0)
+    nonzero = monthly[monthly > 0]
+    return {
+        'total': monthly.sum(),
+        'average': nonzero.mean(),
+        'median': nonzero.median(),
+        'highest': monthly.max() if len(monthly) else np.nan,
+        'highest_month': monthly.idxmax() if len(monthly) else None,
+        'lowest': nonzero.min() if len(nonzero) else np.nan,
+        'lowest_month': nonzero.idxmin() if len(nonzero) else None,
+    }
+
+
+def revenue_by_service(cube, start_period, end_period, services=None):
+    """
+    Revenue per service and month from start_period to end_period (period ordinals, inclusive).
+
+    cube is the RevenueCube of the revenue streams CSV; returns a frame indexed by
+    service with a 'YYYY_Month' column per month of the range present in the data.
+    """
+    table = cube.by_period(start_period, end_period, services)
+    table.columns = [period_label(period) for period in table.columns]
+    return table
+
+
+def call_report(rollup, start, end, callers=None, callees=None, directions=None, per_nurse=False):
+    """
+    Call volume and duration metrics for calls that started at or after start and ended by end.
+
+    Read from a daily_rollup() of the call log (see rollup_rows() for the filters
+    it can answer); start and end must be midnights. With per_nurse, one row per
+    nurse with calls in the range instead of one row for all of them.
+    """
+    if not per_nurse:
+        return pd.DataFrame([rollup_call_metrics(rollup, start, end, callers, callees, directions)])
+    rows = rollup_rows(rollup, start, end, callers, callees, directions)
+    sums = rows.groupby(['Nurse', 'Direction'], observed=True)[['Calls', 'Duration', 'Answered']].sum()
+    totals = sums.groupby(level='Nurse', observed=True).sum()
+    by_direction = sums.unstack('Direction', fill_value=0)
+
+    def direction_sum(measure, direction):
+        key = (measure, direction)
+        return by_direction[key].to_numpy() if key in by_direction.columns else np.zeros(len(by_direction))
+
+    report = pd.DataFrame({
+        'nurse': totals.index.astype(str),
+        'calls': totals['Calls'].to_numpy(dtype=int),
+        'inbound_calls': direction_sum('Calls', 'INBOUND').astype(int),
+        'outbound_calls': direction_sum('Calls', 'OUTBOUND').astype(int),
+        'duration': totals['Duration'].to_numpy(),
+        'inbound_duration': direction_sum('Duration', 'INBOUND'),
+        'outbound_duration': direction_sum('Duration', 'OUTBOUND'),
+        'answered': totals['Answered'].to_numpy(dtype=int),
+    })
+    return report[report['calls'] > 0].reset_index(drop=True)
@@ -0,0 +1,56 @@
+import math
+
+import streamlit as st
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def table_page(data, page, page_size, sort_by=None, descending=False, presorted_by=None):
+    """
+    Rows of page `page` (1-based) of data sorted by sort_by.
+
+    Only the rows of the requested page are taken from the sorted order. When
+    data is already sorted ascending by sort_by (presorted_by), no sort is needed
+    at all: pages are plain slices from either end.
+    """
+    start = (page - 1) * page_size
+    stop = min(start + page_size, len(data))
+    if start >= stop:
+        return data.iloc[:0]
+    if sort_by is None or sort_by == presorted_by:
+        if not descending:
+            return data.iloc[start:stop]
+        return data.iloc[len(data) - stop:len(data) - start][::-1]
+    order = data[sort_by].argsort(kind='stable').to_numpy()
+    if descending:
+        order = order[::-1]
+    return data.iloc[order[start:stop]]
+
+
+def paginated_table(data, key, default_sort=None, presorted_by=None, style_properties=None, derive=None):
+    """
+    Show data as a sortable table one page at a time.
+
+    Sorting happens on the server and only the visible page is sent to the browser,
+    so a pandas Styler (built from style_properties) styles a page of rows rather
+    than the whole frame. derive(rows), if given, adds computed columns to the
+    visible rows only.
+    """
+    columns = list(data.columns)
+    sort_col, order_col, size_col, page_col = st.columns(4)
+    sort_by = sort_col.selectbox('Sort by', columns, index=columns.index(default_sort) if default_sort in columns else 0, key=f'{key}_sort')
+    descending = order_col.selectbox('Order', ['Ascending', 'Descending'], key=f'{key}_order') == 'Descending'
+    page_size = size_col.selectbox('Rows per page', PAGE_SIZES, index=1, key=f'{key}_page_size')
+    page_count = max(1, math.ceil(len(data) / page_size))
+    page = page_col.number_input('Page', min_value=1, max_value=page_count, value=1, step=1, key=f'{key}_page')
+
+    rows = table_page(data, page, page_size, sort_by, descending, presorted_by)
+    first_row = (page - 1) * page_size + 1 if len(rows) else 0
+    st.caption(f'Rows {first_row}-{first_row + len(rows) - 1 if len(rows) else 0} of {len(data)} (page {page} of {page_count})')
+    if derive is not None:
+        rows = derive(rows)
+    if style_properties:
+        st.dataframe(rows.style.set_properties(**style_properties))
+    else:
+        st.dataframe(rows)
+    return rows
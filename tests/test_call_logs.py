@@ -0,0 +1,201 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import call_logs
+from benchmarks.generators import write_call_logs
+from call_logs import (CallLogStore, call_metrics, daily_rollup, filter_calls, parse_exports, rollup_answers,
+                       rollup_call_metrics, rollup_rows)
+
+ROLLUP_ORDER = ['Nurse', 'Direction', 'Day', 'End Time']
+
+
+def export_files(folder, files, seed):
+    """Paths of freshly generated call-log exports, in file order."""
+    write_call_logs(str(folder), files=files, rows=400, callers=6, seed=seed)
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder))]
+
+
+def copy_export(source, folder):
+    target = os.path.join(folder, os.path.basename(source))
+    bump = os.stat(target).st_mtime_ns + 1_000_000 if os.path.exists(target) else None
+    shutil.copy(source, target)
+    if bump is not None:
+        os.utime(target, ns=(bump, bump))  # A rewrite within the same mtime tick still counts as a change
+
+
+def add_midnight_calls(path):
+    """
+    Rewrite the first calls of an export to end after, exactly at and without an end
+    after midnight; returns that midnight.
+    """
+    export = pd.read_csv(path, dtype=str)
+    midnight = pd.Timestamp(export['Start Time'].iloc[0]).tz_localize(None).ceil('D')
+    iso = lambda time: time.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    for row, end in enumerate([iso(midnight + pd.Timedelta(minutes=2)), iso(midnight), '--:--:--']):
+        export.loc[row, ['Start Time', 'Answer Time']] = iso(midnight - pd.Timedelta(minutes=2))
+        export.loc[row, 'End Time'] = end
+    export.to_csv(path, index=False)
+    return midnight
+
+
+def sorted_rollup(rollup):
+    return (rollup.astype({'Nurse': str, 'Direction': str})
+            .sort_values(ROLLUP_ORDER, ignore_index=True)[rollup.columns])
+
+
+def assert_matches_rebuild(store, folder, store_dir):
+    """The store's call log and rollup are those of a store built from scratch over folder."""
+    fresh = CallLogStore(str(folder), store_dir=str(store_dir), parallel=False)
+    expected = fresh.refresh()
+    pd.testing.assert_frame_equal(store.refresh(), expected)
+    pd.testing.assert_frame_equal(sorted_rollup(store.daily_rollup), sorted_rollup(fresh.daily_rollup))
+    pd.testing.assert_frame_equal(sorted_rollup(store.daily_rollup), sorted_rollup(daily_rollup(expected)))
+
+
+@pytest.fixture
+def exports(tmp_path):
+    originals = export_files(tmp_path / 'originals', files=3, seed=11)
+    rewrites = export_files(tmp_path / 'rewrites', files=3, seed=12)
+    folder = tmp_path / 'exports'
+    folder.mkdir()
+    return folder, originals, rewrites
+
+
+def test_store_matches_rebuild_after_add_modify_remove(exports, tmp_path):
+    folder, originals, rewrites = exports
+    for source in originals[:2]:
+        copy_export(source, folder)
+    store = CallLogStore(str(folder), store_dir=str(tmp_path / 'store'), parallel=False)
+    assert_matches_rebuild(store, folder, tmp_path / 'rebuild-initial')
+    version = store.version
+
+    copy_export(originals[2], folder)
+    store.refresh()
+    assert list(store.last_timings) == [os.path.basename(originals[2])]
+    assert store.version == version + 1
+    assert_matches_rebuild(store, folder, tmp_path / 'rebuild-added')
+
+    copy_export(rewrites[0], folder)
+    store.refresh()
+    assert list(store.last_timings) == [os.path.basename(rewrites[0])]
+    assert_matches_rebuild(store, folder, tmp_path / 'rebuild-modified')
+
+    os.remove(os.path.join(folder, os.path.basename(originals[1])))
+    store.refresh()
+    assert store.last_timings == {}
+    assert_matches_rebuild(store, folder, tmp_path / 'rebuild-removed')
+
+
+def test_added_export_is_encoded_without_the_history(exports, tmp_path, monkeypatch):
+    folder, originals, _ = exports
+    for source in originals[1:]:
+        copy_export(source, folder)
+    store = CallLogStore(str(folder), store_dir=str(tmp_path / 'store'), parallel=False)
+    history = len(store.refresh())
+
+    processed = []
+
+    def recorded(name):
+        original = getattr(call_logs, name)
+
+        def record(df, *args, **kwargs):
+            processed.append((name, len(df)))
+            return original(df, *args, **kwargs)
+        return record
+
+    for name in ('compact_frame', 'daily_rollup'):
+        monkeypatch.setattr(call_logs, name, recorded(name))
+    copy_export(originals[0], folder)  # Calls from before those of the history
+    added = len(store.refresh()) - history
+    assert processed == [('compact_frame', added), ('daily_rollup', added)]
+    monkeypatch.undo()
+    assert_matches_rebuild(store, folder, tmp_path / 'rebuild')
+
+
+def test_touched_export_is_not_parsed_again(exports, tmp_path):
+    folder, originals, _ = exports
+    copy_export(originals[0], folder)
+    store = CallLogStore(str(folder), store_dir=str(tmp_path / 'store'), parallel=False)
+    data = store.refresh()
+    version = store.version
+
+    path = os.path.join(folder, os.path.basename(originals[0]))
+    later = os.stat(path).st_mtime_ns + 1_000_000
+    os.utime(path, ns=(later, later))
+    assert store.refresh() is data
+    assert store.last_timings == {}
+    assert store.version == version
+
+
+def test_reload_and_release_read_the_stored_parts(exports, tmp_path):
+    folder, originals, _ = exports
+    for source in originals:
+        copy_export(source, folder)
+    store = CallLogStore(str(folder), store_dir=str(tmp_path / 'store'), parallel=False)
+    data = store.refresh()
+    rollup = sorted_rollup(store.daily_rollup)
+
+    reloaded = CallLogStore(str(folder), store_dir=str(tmp_path / 'store'), parallel=False)
+    pd.testing.assert_frame_equal(reloaded.refresh(), data)
+    assert reloaded.last_timings == {}
+    pd.testing.assert_frame_equal(sorted_rollup(reloaded.daily_rollup), rollup)
+
+    version = store.version
+    store.release()
+    assert store.snapshot()[1] is None
+    pd.testing.assert_frame_equal(store.refresh(), data)
+    assert store.last_timings == {}
+    assert store.version > version
+    pd.testing.assert_frame_equal(sorted_rollup(store.daily_rollup), rollup)
+
+
+def test_parallel_parse_matches_serial(tmp_path):
+    paths = export_files(tmp_path / 'exports', files=4, seed=13)
+    parallel_frames, parallel_timings = parse_exports(paths, parallel=True, max_workers=2)
+    serial_frames, _ = parse_exports(paths, parallel=False)
+    assert len(parallel_frames) == len(parallel_timings) == len(paths)
+    for parallel_frame, serial_frame in zip(parallel_frames, serial_frames):
+        pd.testing.assert_frame_equal(parallel_frame, serial_frame)
+
+
+def test_rollup_answers_only_nurse_side_filters():
+    assert rollup_answers()
+    assert rollup_answers(directions=['INBOUND'])
+    assert rollup_answers(callers=['a'], directions=['OUTBOUND'])
+    assert rollup_answers(callees=['a'], directions=['INBOUND'])
+    assert not rollup_answers(callers=['a'])
+    assert not rollup_answers(callers=['a'], directions=['INBOUND', 'OUTBOUND'])
+    assert not rollup_answers(callees=['a'], directions=['OUTBOUND'])
+    with pytest.raises(ValueError):
+        rollup_rows(pd.DataFrame(columns=ROLLUP_ORDER), '2023-01-01', '2023-02-01', callers=['a'])
+
+
+def test_rollup_metrics_match_filtered_calls(exports, tmp_path):
+    folder, originals, _ = exports
+    for source in originals:
+        copy_export(source, folder)
+    midnight = add_midnight_calls(os.path.join(folder, os.path.basename(originals[0])))
+    store = CallLogStore(str(folder), store_dir=str(tmp_path / 'store'), parallel=False)
+    data = store.refresh()
+    assert store.daily_rollup['End Time'].notna().sum() >= 2  # The calls ending after or at midnight
+    nurses = sorted(name for name in data['From'].cat.categories if name.startswith('Nurse'))
+    first_day = data['Start Time'].min().floor('D')
+    last_day = data['Start Time'].max().ceil('D')
+    day = pd.Timedelta(days=1)
+    ranges = [(first_day, last_day), (first_day + 3 * day, first_day + 40 * day),
+              (midnight - day, midnight), (midnight - day, midnight + day), (midnight, midnight + day)]
+    filters = [{}, {'directions': ['INBOUND']}, {'directions': ['OUTBOUND']}, {'directions': []},
+               {'callers': nurses[:2], 'directions': ['OUTBOUND']},
+               {'callees': nurses[1:4], 'directions': ['INBOUND']}]
+
+    for start, end in ranges:
+        for selection in filters:
+            expected = call_metrics(filter_calls(data, start, end, **selection))
+            actual = rollup_call_metrics(store.daily_rollup, start, end, **selection)
+            for key in ('calls', 'inbound_calls', 'outbound_calls', 'answered'):
+                assert actual[key] == expected[key], (start, end, selection, key)
+            for key in ('duration', 'inbound_duration', 'outbound_duration'):
+                assert actual[key] == pytest.approx(expected[key]), (start, end, selection, key)
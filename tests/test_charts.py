@@ -0,0 +1,52 @@
+import numpy as np
+
+from charts import lttb_indices
+
+
+def reference_lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets written point by point, as in Steinarsson's thesis."""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(x[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(y[next_start:next_end]) / (next_end - next_start)
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, next_start):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+def test_matches_reference_implementation():
+    rng = np.random.default_rng(0)
+    x = np.sort(rng.uniform(0, 1000, size=2000))
+    y = np.cumsum(rng.normal(size=2000))
+    for threshold in (3, 10, 137, 1000, 1999):
+        kept = lttb_indices(x, y, threshold)
+        assert len(kept) == threshold
+        np.testing.assert_array_equal(kept, reference_lttb(x.tolist(), y.tolist(), threshold))
+
+
+def test_keeps_endpoints_and_peaks():
+    x = np.arange(10_000, dtype=float)
+    y = np.zeros(10_000)
+    y[4321] = 50.0
+    y[8765] = -50.0
+    kept = lttb_indices(x, y, 100)
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert np.all(np.diff(kept) > 0)
+    assert {4321, 8765} <= set(kept.tolist())
+
+
+def test_short_series_are_kept_whole():
+    np.testing.assert_array_equal(lttb_indices([0, 1, 2], [5, 4, 3], 10), [0, 1, 2])
+    np.testing.assert_array_equal(lttb_indices(np.arange(50), np.arange(50), 2), np.arange(50))
+    assert len(lttb_indices([], [], 100)) == 0
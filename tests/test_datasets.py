@@ -0,0 +1,109 @@
+import gc
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datasets import DatasetRegistry, dataset_bytes
+
+
+def frame(rows):
+    return pd.DataFrame({'value': np.arange(rows, dtype='float64')})
+
+
+def loaded(registry):
+    return sorted((name, version, leases) for name, version, leases, _, _ in registry.datasets())
+
+
+def test_one_copy_per_version():
+    registry = DatasetRegistry()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return frame(10)
+
+    first = registry.acquire('kpis', 1, build)
+    second = registry.acquire('kpis', 1, build)
+    assert len(builds) == 1
+    assert first.dataset is second.dataset
+    assert loaded(registry) == [('kpis', 1, 2)]
+
+
+def test_old_version_retired_when_its_last_lease_goes():
+    registry = DatasetRegistry()
+    old = registry.acquire('kpis', 1, lambda: frame(10))
+    new = registry.acquire('kpis', 2, lambda: frame(20))
+    assert loaded(registry) == [('kpis', 1, 1), ('kpis', 2, 1)]
+
+    del old
+    gc.collect()
+    assert loaded(registry) == [('kpis', 2, 1)]
+
+    # The current version stays loaded for the next session
+    del new
+    gc.collect()
+    assert loaded(registry) == [('kpis', 2, 0)]
+
+
+def test_budget_drops_least_recently_used_idle_datasets():
+    evicted = []
+    size = dataset_bytes(frame(1000))
+    registry = DatasetRegistry(memory_budget=2.5 * size)
+    kept = registry.acquire('a', 1, lambda: frame(1000), on_evict=lambda: evicted.append('a'))
+    idle = registry.acquire('b', 1, lambda: frame(1000), on_evict=lambda: evicted.append('b'))
+    del idle
+    gc.collect()
+
+    newest = registry.acquire('c', 1, lambda: frame(1000))
+    assert loaded(registry) == [('a', 1, 1), ('c', 1, 1)]
+    assert evicted == ['b']
+
+    # Leased datasets are never dropped, even over the budget
+    over = registry.acquire('d', 1, lambda: frame(1000))
+    assert loaded(registry) == [('a', 1, 1), ('c', 1, 1), ('d', 1, 1)]
+    assert evicted == ['b']
+    assert all(lease.dataset is not None for lease in (kept, newest, over))
+
+
+def test_memory_usage_counts_tuples_and_text():
+    text = pd.DataFrame({'name': ['x' * 100] * 10})
+    numbers = frame(10)
+    assert dataset_bytes((text, numbers)) == dataset_bytes(text) + dataset_bytes(numbers)
+    assert dataset_bytes(text) > text['name'].to_numpy().nbytes
+
+    registry = DatasetRegistry()
+    lease = registry.acquire(('call_log', '/data/Sasi'), 3, lambda: (text, numbers))
+    usage = registry.memory_usage()
+    assert usage.to_dict('records') == [{'Dataset': 'call_log', 'Source': 'Sasi', 'Version': 3, 'Sessions': 1,
+                                         'Bytes': dataset_bytes((text, numbers))}]
+    assert lease.dataset[0] is text
+
+
+def test_concurrent_acquire_never_evicts_a_leased_dataset():
+    registry = DatasetRegistry(memory_budget=1)  # Every idle dataset is over the budget
+    errors = []
+
+    def session(seed):
+        rng = np.random.default_rng(seed)
+        try:
+            for name in rng.choice(['a', 'b', 'c', 'd'], size=300):
+                lease = registry.acquire(name, 1, lambda: frame(10))
+                # The dataset stays registered for as long as the lease is held
+                assert (name, 1) in {(name, version) for name, version, _, _, _ in registry.datasets()}
+                del lease
+        except Exception as error:
+            errors.append(error)
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=session, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert errors == []
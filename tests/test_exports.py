@@ -0,0 +1,26 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import exports
+
+
+def test_published_exports_read_back_and_expire(tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, 'STATIC_DIR', str(tmp_path))
+    monkeypatch.setattr(exports, 'EXPORT_DIR', str(tmp_path / 'exports'))
+    data = pd.DataFrame({'Duration': np.arange(120, dtype=float), 'Direction': ['INBOUND', 'OUTBOUND'] * 60})
+    derive = lambda chunk: chunk.assign(Minutes=chunk['Duration'] / 60)
+
+    csv_path = exports.publish_export(data, 'calls', 'csv', chunk_rows=50, derive=derive)
+    parquet_path = exports.publish_export(data, 'calls', 'parquet', chunk_rows=50, derive=derive)
+    pd.testing.assert_frame_equal(pd.read_csv(csv_path), derive(data))
+    pd.testing.assert_frame_equal(pd.read_parquet(parquet_path), derive(data))
+    assert os.path.dirname(csv_path) != os.path.dirname(parquet_path)
+    assert exports.export_url(csv_path) == f'app/static/exports/{os.path.basename(os.path.dirname(csv_path))}/calls.csv'
+
+    expired = os.path.dirname(csv_path)
+    os.utime(expired, (0, 0))
+    exports.remove_expired_exports()
+    assert not os.path.exists(expired)
+    assert os.path.exists(parquet_path)
@@ -0,0 +1,153 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import assemble_year_sheets, compact_frame, text_labels
+from kpi_store import MONTH_NAMES, MONTH_YEAR, YEAR_MONTH, KpiMatrix, RevenueCube, parse_period, period_ordinal
+from reports import kpi_report, month_labels, revenue_by_service
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def year_workbook(file_path):
+    """A KPI workbook's year sheets as the loaders read them (see data_loader.load_year_matrix)."""
+    excel_file = pd.ExcelFile(file_path)
+    sheets = {sheet: pd.read_excel(excel_file, sheet_name=sheet, usecols='A:M', nrows=100)
+              for sheet in excel_file.sheet_names if sheet.isdigit()}
+    return compact_frame(text_labels(assemble_year_sheets(sheets)))
+
+
+def pl_sheet():
+    sheet = pd.read_excel(os.path.join(ROOT, 'Med-Kick_Investment.xlsx'), sheet_name='Sheet1', usecols='A:S', nrows=100)
+    return compact_frame(text_labels(sheet))
+
+
+def baseline_statistics(row, lowest_excludes):
+    """One KPI's statistics as the dashboard pages computed them from its one-row table."""
+    months = row.to_frame().T.astype(float)
+    monthly_sums = months.sum(axis=0)
+    eligible = monthly_sums[monthly_sums > 0] if lowest_excludes == 'nonpositive' else monthly_sums[monthly_sums != 0]
+    lowest = eligible.min()
+    return {
+        'total': months.sum().sum(),
+        'average': months.mean().mean(),
+        'median': months.median().median(),
+        'highest': monthly_sums.max(),
+        'highest_month': months.columns[monthly_sums.argmax()],
+        'lowest': lowest,
+        'lowest_month': months.columns[monthly_sums == lowest][0] if len(eligible) else None,
+    }
+
+
+def random_matrix(seed=0, kpis=6, months=30):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(1000, 500, size=(kpis, months)).round(2)
+    values[rng.random(values.shape) < 0.15] = np.nan
+    return KpiMatrix([f'KPI {k}' for k in range(kpis)], period_ordinal(2021, 3) + np.arange(months), values)
+
+
+def test_range_totals_match_direct_sums():
+    kpis = random_matrix()
+    months = kpis.values.shape[1]
+    for start in range(months + 1):
+        for stop in range(start, months + 1):
+            totals, counts = kpis.range_totals(slice(start, stop))
+            window = kpis.values[:, start:stop]
+            np.testing.assert_allclose(totals, np.nansum(window, axis=1), rtol=1e-12, atol=1e-9)
+            np.testing.assert_array_equal(counts, (~np.isnan(window)).sum(axis=1))
+    assert kpis.range_totals(np.array([0, 2])) is None
+
+
+def test_positions_and_labels():
+    kpis = random_matrix()
+    labels = month_labels(2021, 5, 2021, 8)
+    assert kpis.positions(labels) == slice(2, 6)
+    np.testing.assert_array_equal(kpis.positions(['2021_March', '2021_May', '1999_May']), [0, 2])
+    assert list(kpis.to_frame(slice(2, 6)).columns) == ['KPI'] + labels
+
+
+def test_months_between_sheets_are_left_out():
+    wide = pd.DataFrame({'KPI': ['Refunds'], '2023_January': [-3.0], '2021_December': [-1.0], '2023_February': [-2.0]})
+    kpis = KpiMatrix.from_wide(wide)
+    assert kpis.labels == ['2021_December', '2023_January', '2023_February']
+    assert (kpis.first_period, kpis.last_period) == (period_ordinal(2021, 12), period_ordinal(2023, 2))
+    assert kpis.positions(month_labels(2021, 12, 2023, 2)) == slice(0, 3)
+    table, stats = kpi_report(kpis, month_labels(2021, 1, 2023, 12))
+    assert list(table.columns) == ['KPI'] + kpis.labels
+    assert stats.loc[0, 'highest_month'] == '2021_December'
+
+
+def test_compacted_values_stay_float32():
+    wide = pd.DataFrame({'KPI': ['a', 'b'], 'March_2022': [1.5, np.nan], 'April_2022': [2.0, 3.25]})
+    kpis = KpiMatrix.from_wide(compact_frame(wide), MONTH_YEAR)
+    assert kpis.values.dtype == np.float32
+    assert kpis.labels == ['March_2022', 'April_2022']
+    table = kpis.to_frame()
+    assert (table.dtypes[1:] == np.float64).all()
+    totals, counts = kpis.range_totals(slice(0, 2))
+    np.testing.assert_array_equal(totals, [3.5, 3.25])
+    np.testing.assert_array_equal(counts, [2, 1])
+    with pytest.raises(ValueError):
+        kpis.values[0, 0] = 1.0  # Shared by every session
+
+
+@pytest.mark.parametrize('workbook, label_format, lowest_excludes', [
+    ('KPI123.xlsx', YEAR_MONTH, 'nonpositive'),
+    ('finance.xlsx', YEAR_MONTH, 'nonpositive'),
+    ('Med-Kick_Investment.xlsx', MONTH_YEAR, 'zero'),
+])
+def test_kpi_statistics_match_baseline(workbook, label_format, lowest_excludes):
+    wide = pl_sheet() if label_format == MONTH_YEAR else year_workbook(os.path.join(ROOT, workbook))
+    kpis = KpiMatrix.from_wide(wide, label_format)
+    source = wide.set_index('KPI')
+    selections = [kpis.labels, kpis.labels[3:11], kpis.labels[:1], kpis.labels[1::4]]
+    for labels in selections:
+        table, stats = kpi_report(kpis, labels, lowest_excludes=lowest_excludes)
+        assert len(stats) == len(wide)
+        for kpi, actual in zip(table['KPI'], stats.to_dict('records')):
+            expected = baseline_statistics(source.loc[kpi, [label for label in labels if label in source]],
+                                           lowest_excludes)
+            for key, value in expected.items():
+                if key.endswith('_month'):
+                    assert actual[key] == value or value is None and pd.isna(actual[key]), (workbook, kpi, key)
+                else:
+                    assert actual[key] == pytest.approx(value, rel=1e-9, nan_ok=True), (workbook, kpi, key)
+
+
+def revenue_csv():
+    return pd.read_csv(os.path.join(ROOT, 'FinDataOutputRevenue.csv'))
+
+
+def test_revenue_cube_by_service_matches_groupby():
+    df = revenue_csv()
+    cube = RevenueCube.from_table(df)
+    rows = df[df['Revenue Stream by Service'].notna() & df['Year'].notna()].astype({'Revenue Stream by Service': str})
+    years = sorted(rows['Year'].unique())
+    for selected_years in (None, years[:1], years[-2:]):
+        selected = rows if selected_years is None else rows[rows['Year'].isin(selected_years)]
+        expected = selected.groupby('Revenue Stream by Service')[MONTH_NAMES].sum()
+        pd.testing.assert_frame_equal(cube.by_service(years=selected_years), expected,
+                                      check_names=False, check_index_type=False)
+    services = sorted(rows['Revenue Stream by Service'].unique())[:3]
+    expected = rows[rows['Revenue Stream by Service'].isin(services)].groupby('Revenue Stream by Service')[MONTH_NAMES].sum()
+    pd.testing.assert_frame_equal(cube.by_service(services), expected, check_names=False, check_index_type=False)
+
+
+def test_revenue_cube_by_period_matches_melted_rows():
+    df = revenue_csv()
+    cube = RevenueCube.from_table(df)
+    rows = df[df['Revenue Stream by Service'].notna() & df['Year'].notna()].astype({'Revenue Stream by Service': str})
+    long = rows.melt(id_vars=['Revenue Stream by Service', 'Year'], value_vars=MONTH_NAMES, var_name='month')
+    long['label'] = long['Year'].astype(int).astype(str) + '_' + long['month']
+    long['period'] = long['label'].map(parse_period)
+    years = sorted(rows['Year'].astype(int).unique())
+    start, end = period_ordinal(years[0], 4), period_ordinal(years[-1], 9)
+
+    table = revenue_by_service(cube, start, end)
+    in_range = long[(long['period'] >= start) & (long['period'] <= end)]
+    expected = in_range.pivot_table(index='Revenue Stream by Service', columns='period', values='value', aggfunc='sum',
+                                    fill_value=0.0, dropna=False)
+    expected.columns = in_range.drop_duplicates('period').sort_values('period')['label'].tolist()
+    pd.testing.assert_frame_equal(table, expected.astype(float), check_names=False, check_index_type=False)